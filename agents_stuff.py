@@ -1,11 +1,13 @@
 import argparse
 import json
+import re
 from argparse import RawTextHelpFormatter
-import requests
 from typing import Optional
 import warnings
 from dotenv import load_dotenv
 import os
+from template_engine import parse_fill_data
+from langflow_client import get_langflow_client, run_flow_async, stream_flow_async, fan_out, BASE_API_URL
 
 MESSAGE='based upon the personality data given, create 3 personas that this user would like to interact with. Then use the News data and use it to create some social media posts. Create one post each. These posts will be used by other AI agents. Only provide posts, do not provide any other text including the personas'
 
@@ -18,9 +20,34 @@ except ImportError:
     warnings.warn("Langflow provides a function to help you upload files to the flow. Please install langflow to use it.")
     upload_file = None
 
-BASE_API_URL = "http://127.0.0.1:7860"
 FLOW_ID = "0d44668a-cfe2-4dcb-b59e-58f6e7217037"
 ENDPOINT = "post-gen" # The endpoint name of the flow
+HTML_ENDPOINT = "build-html"
+# Single-call flow (chat input -> model -> chat output) that writes the posts and fills the template at once;
+# it is not part of a stock Langflow install, see "Langflow flows" in README.md for how to build it
+COMBINED_ENDPOINT = "post-gen-html"
+COMBINED_MESSAGE = """{instructions}
+
+Personality data:
+{personality_data}
+
+News data:
+{news_data}
+
+HTML template:
+{template}
+
+Then, using the HTML template above, replicate the html code once per post with the post filled in. If there are names, randomize the names to make it more personal.
+Answer in exactly this format and nothing else:
+<posts>
+the posts, one per paragraph
+</posts>
+<html>
+the html code only
+</html>"""
+# Structured fill: the build-html flow gets the slot schema instead of the template and answers with JSON
+FILL_MESSAGE = "Given a JSON object describing the text slots of an HTML template (each slot shows its example text), and the social media posts, write one JSON object per post with the same keys, filling each slot with text for that post. If there are names, randomize the names to make it more personal. Answer with a JSON list of objects only, no explanation and no HTML."
+HTML_MESSAGE = "You are a good html programmer. Given a piece of template, and the 3 social media posts. Replicate the html code and give it back. Only give html code and nothing else. Do not give explaination of the code. Also, if there are names, randomize the names to make it more personal."
 
 # You can tweak the flow by adding a tweaks dictionary
 # e.g {"OpenAI-XXXXX": {"model_name": "gpt-4"}}
@@ -30,29 +57,60 @@ def run_flow(message: str,
   output_type: str = "chat",
   input_type: str = "chat",
   tweaks: Optional[dict] = None,
-  api_key: Optional[str] = None) -> dict:
+  api_key: Optional[str] = None,
+  use_cache: bool = True) -> dict:
     """
     Run a flow with a given message and optional tweaks.
 
     :param message: The message to send to the flow
     :param endpoint: The ID or the endpoint name of the flow
     :param tweaks: Optional tweaks to customize the flow
+    :param use_cache: Reuse the result of an identical earlier run
     :return: The JSON response from the flow
     """
-    api_url = f"{BASE_API_URL}/api/v1/run/{endpoint}"
+    return get_langflow_client().run_flow(
+        message,
+        endpoint=endpoint,
+        output_type=output_type,
+        input_type=input_type,
+        tweaks=tweaks,
+        api_key=api_key,
+        use_cache=use_cache
+    )
+
+def _output_text(response: dict) -> str:
+    return response['outputs'][0]['outputs'][0]['results']['message']['data']['text']
+
+def _combined_output_text(response: dict) -> str:
+    try:
+        return _output_text(response)
+    except (KeyError, IndexError, TypeError):
+        detail = response.get('detail', response) if isinstance(response, dict) else response
+        raise RuntimeError(
+            f"The '{COMBINED_ENDPOINT}' flow returned no message ({detail}). "
+            "Create it in Langflow first; see 'Langflow flows' in README.md."
+        )
+
+def _social_posts_tweaks(news_data: str, personality_data: str) -> dict:
+    return {
+        "TextInput-8a4Ef": {"input_value": news_data},
+        "TextInput-PfHai": {"input_value": personality_data},
+        "CombineText-BBJix": {},
+        "OpenAIModel-wvwF1": {},
+        "TextInput-Q2T03": {},
+        "ChatInput-SjChs": {},
+        "ChatOutput-oAMDi": {}
+    }
 
-    payload = {
-        "input_value": message,
-        "output_type": output_type,
-        "input_type": input_type,
+def _build_html_tweaks(posts: str, template: Optional[str], stream: bool = False) -> dict:
+    return {
+        "TextInput-8fyZk": {"input_value": template} if template else {},
+        "TextInput-qQTzX": {"input_value": posts} if posts else {},
+        "ChatInput-tbWNG": {},
+        "OpenAIModel-4zPqb": {"stream": True} if stream else {},
+        "ChatOutput-nSI1W": {},
+        "CombineText-P2Nrl": {}
     }
-    headers = None
-    if tweaks:
-        payload["tweaks"] = tweaks
-    if api_key:
-        headers = {"x-api-key": api_key}
-    response = requests.post(api_url, json=payload, headers=headers)
-    return response.json()
 
 def generate_social_posts(news_data: str, personality_data: str) -> str:
     """
@@ -65,23 +123,13 @@ def generate_social_posts(news_data: str, personality_data: str) -> str:
     Returns:
         str: Generated social media posts
     """
-    tweaks = {
-        "TextInput-8a4Ef": {"input_value": news_data},
-        "TextInput-PfHai": {"input_value": personality_data},
-        "CombineText-BBJix": {},
-        "OpenAIModel-wvwF1": {},
-        "TextInput-Q2T03": {},
-        "ChatInput-SjChs": {},
-        "ChatOutput-oAMDi": {}
-    }
-    
     response = run_flow(
         message=MESSAGE,
         endpoint=ENDPOINT,
-        tweaks=tweaks
+        tweaks=_social_posts_tweaks(news_data, personality_data)
     )
     
-    return response['outputs'][0]['outputs'][0]['results']['message']['data']['text']
+    return _output_text(response)
 
 def build_html_from_posts(posts: str, template: Optional[str] = None) -> str:
     """
@@ -94,23 +142,163 @@ def build_html_from_posts(posts: str, template: Optional[str] = None) -> str:
     Returns:
         str: Generated HTML content
     """
-    tweaks = {
-        "TextInput-8fyZk": {"input_value": template} if template else {},
-        "TextInput-qQTzX": {"input_value": posts} if posts else {},
-        "ChatInput-tbWNG": {},
-        "OpenAIModel-4zPqb": {},
-        "ChatOutput-nSI1W": {},
-        "CombineText-P2Nrl": {}
-    }
+    response = run_flow(
+        message=HTML_MESSAGE,
+        endpoint=HTML_ENDPOINT,
+        tweaks=_build_html_tweaks(posts, template)
+    )
     
-    message = "You are a good html programmer. Given a piece of template, and the 3 social media posts. Replicate the html code and give it back. Only give html code and nothing else. Do not give explaination of the code. Also, if there are names, randomize the names to make it more personal."
+    return _output_text(response)
+
+async def generate_social_posts_async(news_data: str, personality_data: str) -> str:
+    """
+    Async version of generate_social_posts.
+    """
+    response = await run_flow_async(
+        MESSAGE,
+        endpoint=ENDPOINT,
+        tweaks=_social_posts_tweaks(news_data, personality_data)
+    )
+    return _output_text(response)
+
+async def build_html_from_posts_async(posts: str, template: Optional[str] = None) -> str:
+    """
+    Async version of build_html_from_posts.
+    """
+    response = await run_flow_async(
+        HTML_MESSAGE,
+        endpoint=HTML_ENDPOINT,
+        tweaks=_build_html_tweaks(posts, template)
+    )
+    return _output_text(response)
+
+def build_fill_data_from_posts(posts: str, slot_schema: str) -> list:
+    """
+    Ask the model for the slot values of each post instead of the full HTML.
+    
+    Args:
+        posts (str): Social media posts to lay out
+        slot_schema (str): JSON slot description from SectionTemplate.schema()
+        
+    Returns:
+        list: Slot value dicts, one per post
+    """
     response = run_flow(
-        message=message,
-        endpoint="build-html",
-        tweaks=tweaks
+        message=FILL_MESSAGE,
+        endpoint=HTML_ENDPOINT,
+        tweaks=_build_html_tweaks(posts, slot_schema)
     )
+    return parse_fill_data(_output_text(response))
+
+async def build_fill_data_from_posts_async(posts: str, slot_schema: str) -> list:
+    """
+    Async version of build_fill_data_from_posts.
+    """
+    response = await run_flow_async(
+        FILL_MESSAGE,
+        endpoint=HTML_ENDPOINT,
+        tweaks=_build_html_tweaks(posts, slot_schema)
+    )
+    return parse_fill_data(_output_text(response))
+
+_COMBINED_SECTION = re.compile(r"<(posts|html)>\s*(.*?)\s*</\1>", re.DOTALL | re.IGNORECASE)
+
+def split_combined_output(text: str) -> tuple:
+    """
+    Split the output of the combined flow into its posts and HTML parts.
     
-    return response['outputs'][0]['outputs'][0]['results']['message']['data']['text']
+    Args:
+        text (str): Raw flow output with <posts> and <html> sections
+        
+    Returns:
+        tuple: (posts, html); html falls back to the whole text if the sections are missing
+    """
+    sections = {name.lower(): body for name, body in _COMBINED_SECTION.findall(text)}
+    if "html" not in sections:
+        # The model ignored the format; treat the output as HTML so the page still renders
+        return sections.get("posts", ""), text.strip()
+    return sections.get("posts", ""), sections["html"]
+
+def _combined_message(news_data: str, personality_data: str, template: Optional[str]) -> str:
+    return COMBINED_MESSAGE.format(
+        instructions=MESSAGE,
+        personality_data=personality_data,
+        news_data=news_data,
+        template=template or ""
+    )
+
+def generate_posts_and_html(news_data: str, personality_data: str, template: Optional[str] = None) -> tuple:
+    """
+    Generate social media posts and the filled HTML in a single flow run.
+    
+    Args:
+        news_data (str): News data in formatted string
+        personality_data (str): Personality traits in formatted string
+        template (Optional[str]): HTML template to fill
+        
+    Returns:
+        tuple: (posts, html)
+    """
+    response = run_flow(
+        message=_combined_message(news_data, personality_data, template),
+        endpoint=COMBINED_ENDPOINT
+    )
+    return split_combined_output(_combined_output_text(response))
+
+async def generate_posts_and_html_async(news_data: str, personality_data: str, template: Optional[str] = None) -> tuple:
+    """
+    Async version of generate_posts_and_html.
+    """
+    response = await run_flow_async(
+        _combined_message(news_data, personality_data, template),
+        endpoint=COMBINED_ENDPOINT
+    )
+    return split_combined_output(_combined_output_text(response))
+
+def stream_html_from_posts(posts: str, template: Optional[str] = None):
+    """
+    Build HTML content from social media posts, yielding it in chunks as it is generated.
+    
+    Args:
+        posts (str): Social media posts to convert to HTML
+        template (Optional[str]): Optional HTML template to use for formatting
+        
+    Returns:
+        generator: HTML text chunks
+    """
+    return get_langflow_client().stream_flow(
+        HTML_MESSAGE,
+        endpoint=HTML_ENDPOINT,
+        tweaks=_build_html_tweaks(posts, template, stream=True)
+    )
+
+def stream_html_from_posts_async(posts: str, template: Optional[str] = None):
+    """
+    Async version of stream_html_from_posts.
+    """
+    return stream_flow_async(
+        HTML_MESSAGE,
+        endpoint=HTML_ENDPOINT,
+        tweaks=_build_html_tweaks(posts, template, stream=True)
+    )
+
+async def generate_social_posts_variants_async(news_data: str, personality_variants: list, limit: int = 4) -> list:
+    """
+    Generate posts for several personality variants concurrently.
+    
+    Args:
+        news_data (str): News data in formatted string
+        personality_variants (list): Personality trait strings, one per variant
+        limit (int): Maximum number of flow runs in flight
+        
+    Returns:
+        list: Generated posts, in the order of personality_variants
+    """
+    return await fan_out(
+        [lambda personality_data=personality_data: generate_social_posts_async(news_data, personality_data)
+         for personality_data in personality_variants],
+        limit=limit
+    )
 
 def main():
     parser = argparse.ArgumentParser(description="""Run a flow with a given message and optional tweaks.
@@ -0,0 +1,194 @@
+import os
+import asyncio
+import re
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+
+load_dotenv()
+
+ASSISTANT_ID = os.getenv("OPENAI_ASSISTANT_ID")
+# Polls start fine-grained and back off so long runs do not flood the API
+POLL_INITIAL = float(os.getenv("ASSISTANT_POLL_INITIAL", "0.1"))
+POLL_MAX = float(os.getenv("ASSISTANT_POLL_MAX", "1"))
+POLL_FACTOR = 1.3
+# Share of the typical run duration slept before the first poll
+FIRST_POLL_SHARE = 0.8
+RUN_TIMEOUT = float(os.getenv("ASSISTANT_RUN_TIMEOUT", "300"))
+CONCURRENCY = int(os.getenv("ASSISTANT_CONCURRENCY", "4"))
+
+FAILED_STATUSES = {"failed", "cancelled", "expired", "incomplete", "requires_action"}
+
+class AssistantError(Exception):
+    pass
+
+class RunDurationEstimate:
+    def __init__(self, alpha: float = 0.3):
+        """
+        Moving average of how long assistant runs take, used to time the first poll
+
+        :param alpha: weight of the newest observation
+        """
+        self.alpha = alpha
+        self.seconds = None
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.seconds = seconds if self.seconds is None else self.alpha * seconds + (1 - self.alpha) * self.seconds
+
+_run_duration = RunDurationEstimate()
+
+def poll_delays(expected: Optional[float] = None, initial: float = POLL_INITIAL, maximum: float = POLL_MAX,
+                factor: float = POLL_FACTOR):
+    """
+    Delays between run status checks
+
+    The first poll waits for most of the expected run time; after that the delays grow
+    geometrically from initial, capped at maximum.
+
+    :param expected: typical run duration in seconds, if known
+    :return: infinite generator of seconds to wait
+    """
+    if expected:
+        yield max(initial, expected * FIRST_POLL_SHARE)
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * factor, maximum)
+
+def extract_selector_json(response: str) -> str:
+    """
+    Pull the ```json block out of the assistant's answer
+
+    :param response: assistant message text
+    :return: the JSON text inside the block
+    """
+    json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
+    if not json_match:
+        raise AssistantError("No JSON found in assistant response")
+    return json_match.group(1)
+
+def _thread_payload(body_content: str) -> dict:
+    return {"messages": [{"role": "user", "content": body_content}]}
+
+def _check_status(run):
+    if run.status in FAILED_STATUSES:
+        raise AssistantError(f"Assistant run failed with status: {run.status}")
+    return run.status == "completed"
+
+def _latest_text(messages) -> str:
+    return messages.data[0].content[0].text.value
+
+_client = None
+_client_lock = threading.Lock()
+_async_client = None
+
+def get_openai_client() -> OpenAI:
+    """
+    Shared OpenAI client; reusing it keeps its HTTP connections alive between pages
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return _client
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Shared async OpenAI client for the running event loop
+    """
+    global _async_client
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.loop is not loop:
+        _async_client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        _async_client.loop = loop
+    return _async_client
+
+def run_assistant(body_content: str, client: Optional[OpenAI] = None, assistant_id: Optional[str] = None,
+                  timeout: float = RUN_TIMEOUT) -> str:
+    """
+    Send a page body to the assistant and return its selector JSON
+
+    The thread, message and run are created in one request, and the run is polled
+    around its expected finish time instead of with a fixed one-second sleep.
+
+    :param body_content: HTML body to analyse
+    :param client: OpenAI client; defaults to the shared one
+    :param assistant_id: assistant to run; defaults to OPENAI_ASSISTANT_ID
+    :param timeout: seconds to wait for the run to finish
+    :return: JSON text with the tag and class of the repeatable section
+    """
+    client = client or get_openai_client()
+    run = client.beta.threads.create_and_run(
+        assistant_id=assistant_id or ASSISTANT_ID,
+        thread=_thread_payload(body_content)
+    )
+    started = time.monotonic()
+    delays = poll_delays(_run_duration.seconds)
+    while not _check_status(run):
+        if time.monotonic() - started > timeout:
+            raise AssistantError(f"Assistant run did not finish within {timeout}s")
+        time.sleep(next(delays))
+        run = client.beta.threads.runs.retrieve(thread_id=run.thread_id, run_id=run.id)
+    _run_duration.observe(time.monotonic() - started)
+
+    messages = client.beta.threads.messages.list(thread_id=run.thread_id, order="desc", limit=1)
+    return extract_selector_json(_latest_text(messages))
+
+async def run_assistant_async(body_content: str, client: Optional[AsyncOpenAI] = None,
+                              assistant_id: Optional[str] = None, timeout: float = RUN_TIMEOUT) -> str:
+    """
+    Async version of run_assistant
+    """
+    client = client or get_async_openai_client()
+    run = await client.beta.threads.create_and_run(
+        assistant_id=assistant_id or ASSISTANT_ID,
+        thread=_thread_payload(body_content)
+    )
+    started = time.monotonic()
+    delays = poll_delays(_run_duration.seconds)
+    while not _check_status(run):
+        if time.monotonic() - started > timeout:
+            raise AssistantError(f"Assistant run did not finish within {timeout}s")
+        await asyncio.sleep(next(delays))
+        run = await client.beta.threads.runs.retrieve(thread_id=run.thread_id, run_id=run.id)
+    _run_duration.observe(time.monotonic() - started)
+
+    messages = await client.beta.threads.messages.list(thread_id=run.thread_id, order="desc", limit=1)
+    return extract_selector_json(_latest_text(messages))
+
+async def process_bodies_async(bodies: list, limit: int = CONCURRENCY, client: Optional[AsyncOpenAI] = None,
+                               assistant_id: Optional[str] = None) -> list:
+    """
+    Run the assistant over a queue of page bodies, at most 'limit' runs at a time
+
+    :param bodies: HTML bodies to analyse
+    :param limit: number of workers pulling from the queue
+    :param client: AsyncOpenAI client; defaults to the shared one
+    :param assistant_id: assistant to run; defaults to OPENAI_ASSISTANT_ID
+    :return: selector JSON or the raised exception per body, in input order
+    """
+    client = client or get_async_openai_client()
+    queue = asyncio.Queue()
+    for index, body_content in enumerate(bodies):
+        queue.put_nowait((index, body_content))
+    results = [None] * len(bodies)
+
+    async def worker():
+        while True:
+            try:
+                index, body_content = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                results[index] = await run_assistant_async(body_content, client, assistant_id)
+            except Exception as e:
+                results[index] = e
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(limit, len(bodies))))))
+    return results
@@ -1,17 +1,127 @@
 import os
+import asyncio
+import base64
+import hashlib
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 import requests
+import httpx
 import json
 import argparse
 from datetime import datetime
-from uuid import uuid4
 from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from template_cache import TemplateCache, DiskTemplateCache, MISSING
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-class AstraDBClient:
-    def __init__(self):
+# Connection pool settings shared by every client in the process
+POOL_SIZE = int(os.getenv('ASTRA_DB_POOL_SIZE', '10'))
+BATCH_WORKERS = int(os.getenv('ASTRA_DB_BATCH_WORKERS', '8'))
+BATCH_LOOKUP_SIZE = 50
+CONNECT_TIMEOUT = float(os.getenv('ASTRA_DB_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.getenv('ASTRA_DB_READ_TIMEOUT', '10'))
+
+_session = None
+_session_lock = threading.Lock()
+_default_client = None
+_client_lock = threading.Lock()
+
+# Content-addressed storage: URL -> template digest -> compressed template body
+URL_TABLE = "url_templates"
+BLOB_TABLE = "template_blobs"
+BLOB_ENCODING = "zlib+base64"
+# Table written before content-addressed storage, still read as a fallback
+LEGACY_TABLE = "url_cache_base3"
+# Create the content-addressed tables on the first write if they do not exist yet
+AUTO_CREATE_TABLES = os.getenv('ASTRA_DB_AUTO_CREATE_TABLES', '1') != '0'
+_tables_ready = False
+_tables_lock = threading.Lock()
+
+# In-process cache in front of template lookups
+template_cache = TemplateCache(
+    max_entries=int(os.getenv('TEMPLATE_CACHE_SIZE', '256')),
+    ttl=float(os.getenv('TEMPLATE_CACHE_TTL', '300')),
+    negative_ttl=float(os.getenv('TEMPLATE_CACHE_NEGATIVE_TTL', '30'))
+)
+# Template bodies by digest; content never changes for a digest, so entries live long
+blob_cache = TemplateCache(max_entries=int(os.getenv('TEMPLATE_CACHE_SIZE', '256')), ttl=24 * 3600, key_func=str)
+
+# Persistent cache consulted after the in-process one, opened on first use
+DISK_CACHE_ENABLED = os.getenv('TEMPLATE_DISK_CACHE', '1') != '0'
+DISK_CACHE_REVALIDATE_AFTER = float(os.getenv('TEMPLATE_DISK_CACHE_REVALIDATE', '3600'))
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+def get_disk_cache():
+    """
+    Return the shared on-disk template cache, or None if it is disabled
+    
+    Returns:
+        DiskTemplateCache: Persistent cache under the application directory
+    """
+    global _disk_cache
+    if not DISK_CACHE_ENABLED:
+        return None
+    if _disk_cache is None:
+        with _disk_cache_lock:
+            if _disk_cache is None:
+                _disk_cache = DiskTemplateCache(revalidate_after=DISK_CACHE_REVALIDATE_AFTER)
+    return _disk_cache
+
+def create_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    """
+    Create a requests session with a keep-alive connection pool
+    
+    Args:
+        pool_size (int): Maximum number of pooled connections per host
+        
+    Returns:
+        requests.Session: Session that reuses TCP/TLS connections
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    """
+    Return the process-wide pooled session, creating it on first use
+    
+    Args:
+        pool_size (int): Pool size used if the session does not exist yet
+        
+    Returns:
+        requests.Session: Shared session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session(pool_size)
+    return _session
+
+def close_session():
+    """
+    Close the shared session and drop the shared client
+    """
+    global _session, _default_client
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+    with _client_lock:
+        _default_client = None
+
+class _AstraDBRequests:
+    """
+    Configuration, URL and payload helpers shared by the sync and async clients
+    """
+    def _configure(self):
         # Get environment variables
         self.db_id = '839635db-b3b0-4b64-b71e-90531f6aae36'
         self.db_region = 'us-east1'
@@ -24,13 +134,15 @@ class AstraDBClient:
             'x-cassandra-token': self.token
         }
 
-    def create_table(self, table_name, column_definitions, primary_key):
-        """
-        Create a table in the keyspace
-        """
-        url = f"{self.base_url}/api/rest/v2/schemas/keyspaces/{self.keyspace}/tables"
-        
-        payload = {
+    def _table_url(self, table_name):
+        return f"{self.base_url}/api/rest/v2/keyspaces/{self.keyspace}/{table_name}"
+
+    def _schema_url(self):
+        return f"{self.base_url}/api/rest/v2/schemas/keyspaces/{self.keyspace}/tables"
+
+    @staticmethod
+    def _table_payload(table_name, column_definitions, primary_key):
+        return {
             "name": table_name,
             "ifNotExists": True,
             "columnDefinitions": column_definitions,
@@ -40,90 +152,939 @@ class AstraDBClient:
             }
         }
 
-        response = requests.post(url, headers=self.headers, json=payload)
-        print(self.headers)
+    def _key_url(self, table_name, key):
+        return f"{self._table_url(table_name)}/{quote(key, safe='')}"
+
+    @staticmethod
+    def _url_query(url):
+        return {"where": json.dumps({"url": {"$eq": url}})}
+
+    @staticmethod
+    def _in_query(column, values):
+        return {"where": json.dumps({column: {"$in": values}}), "page-size": len(values) * 2}
+
+    @staticmethod
+    def _response_data(response):
+        """
+        Decode a lookup response; a 404 or empty body means no rows, other errors raise
+        """
+        if response.status_code == 404:
+            return {}
+        response.raise_for_status()
+        return response.json() if response.content else {}
+
+    @staticmethod
+    def _first_row(data):
+        return data["data"][0] if data.get("data") else None
+
+    @staticmethod
+    def _next_page(params, data, values, rows, column):
+        """
+        Query for the next page of an $in lookup, or None once every value has a row or the pages run out
+        """
+        page_state = data.get("pageState")
+        if not page_state or set(values) <= {row.get(column) for row in rows}:
+            return None
+        return dict(params, **{"page-state": page_state})
+
+    @staticmethod
+    def _collect_first(results, rows, column):
+        # Keep the first match per value, like get_row
+        for row in rows:
+            if results.get(row.get(column), False) is None:
+                results[row[column]] = row
+
+class AstraDBClient(_AstraDBRequests):
+    def __init__(self, session: requests.Session = None, timeout=None):
+        self._configure()
+        # Requests go through a pooled session so connections stay warm between calls
+        self.session = session or get_session()
+        self.timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+    def _request(self, method, url, **kwargs):
+        """
+        Send a request through the pooled session with the client timeout
+        """
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return self.session.request(method, url, headers=self.headers, **kwargs)
+
+    def create_table(self, table_name, column_definitions, primary_key, timeout=None):
+        """
+        Create a table in the keyspace
+        """
+        payload = self._table_payload(table_name, column_definitions, primary_key)
+        response = self._request('POST', self._schema_url(), json=payload, timeout=timeout)
         return response.json() if response.content else response.status_code
 
-    def add_row(self, table_name, data):
+    def add_row(self, table_name, data, timeout=None):
         """
         Add a row to the specified table
         """
-        url = f"{self.base_url}/api/rest/v2/keyspaces/{self.keyspace}/{table_name}"
-        print(self.headers)
-        print(url)
-        response = requests.post(url, headers=self.headers, json=data)
+        response = self._request('POST', self._table_url(table_name), json=data, timeout=timeout)
         return response.json() if response.content else response.status_code
 
-    def get_row(self, table_name, url):
+    def get_row(self, table_name, url, timeout=None):
         """
         Retrieve a row from the specified table by searching for its URL
         
         Args:
             table_name (str): Name of the table
             url (str): URL to search for
+            timeout (float or tuple, optional): Per-request timeout override
             
         Returns:
             dict: Row data if found, None if not found
         """
-        request_url = f"{self.base_url}/api/rest/v2/keyspaces/{self.keyspace}/{table_name}"
         # Add query parameters to search by URL
-        params = {
-            "where": {
-                "url": {
-                    "$eq": url
-                }
-            }
-        }
-        response = requests.get(request_url, headers=self.headers, params={"where": json.dumps(params["where"])})
-        if response.status_code == 404 or not response.content:
-            return None
-        
-        data = response.json()
+        response = self._request('GET', self._table_url(table_name), params=self._url_query(url), timeout=timeout)
         # The response will be a list of matching rows, we want the first one
-        return data["data"][0] if data.get("data") else None
+        return self._first_row(self._response_data(response))
 
-def add_url_template_to_db(url: str, template_content: str) -> dict:
+    def add_rows(self, table_name, rows, max_workers=BATCH_WORKERS, timeout=None):
+        """
+        Add many rows to the specified table with bounded concurrency
+        
+        The REST API takes one row per request, so rows are sent in parallel
+        over the pooled session, at most max_workers in flight at a time.
+        
+        Args:
+            table_name (str): Name of the table
+            rows (list): Row dicts to insert
+            max_workers (int): Maximum number of concurrent requests
+            timeout (float or tuple, optional): Per-request timeout override
+            
+        Returns:
+            list: One result per row, in input order; failed rows hold the exception
+        """
+        return self._map_concurrently(lambda row: self.add_row(table_name, row, timeout=timeout), rows, max_workers)
+
+    def upsert_rows(self, table_name, keyed_rows, max_workers=BATCH_WORKERS, timeout=None):
+        """
+        Insert or replace many rows by primary key with bounded concurrency
+        
+        Args:
+            table_name (str): Name of the table
+            keyed_rows (list): (key, data) tuples
+            max_workers (int): Maximum number of concurrent requests
+            timeout (float or tuple, optional): Per-request timeout override
+            
+        Returns:
+            list: One result per row, in input order; failed rows hold the exception
+        """
+        return self._map_concurrently(
+            lambda item: self.upsert_row(table_name, item[0], item[1], timeout=timeout), keyed_rows, max_workers
+        )
+
+    @staticmethod
+    def _map_concurrently(func, items, max_workers):
+        def call(item):
+            try:
+                return func(item)
+            except requests.RequestException as e:
+                return e
+
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            return list(executor.map(call, items))
+
+    def get_rows(self, table_name, urls, batch_size=BATCH_LOOKUP_SIZE, max_workers=BATCH_WORKERS, timeout=None, column="url"):
+        """
+        Retrieve the rows for many URLs using $in queries
+        
+        Args:
+            table_name (str): Name of the table
+            urls (list): URLs (or other column values) to search for
+            batch_size (int): Number of URLs per $in query
+            max_workers (int): Maximum number of concurrent queries
+            timeout (float or tuple, optional): Per-request timeout override
+            column (str): Column the values are matched against
+            
+        Returns:
+            dict: Maps each URL to its row, or None if not found
+        """
+        request_url = self._table_url(table_name)
+        urls = list(dict.fromkeys(urls))
+        batches = [urls[i:i + batch_size] for i in range(0, len(urls), batch_size)]
+
+        def lookup(batch):
+            # Duplicate rows can push a value's first match past the first page
+            params, rows = self._in_query(column, batch), []
+            while params is not None:
+                data = self._response_data(self._request('GET', request_url, params=params, timeout=timeout))
+                rows.extend(data.get("data") or [])
+                params = self._next_page(params, data, batch, rows, column)
+            return rows
+
+        results = {url: None for url in urls}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches) or 1))) as executor:
+            for rows in executor.map(lookup, batches):
+                self._collect_first(results, rows, column)
+        return results
+
+    def upsert_row(self, table_name, key, data, timeout=None):
+        """
+        Insert or replace the row with the given primary key
+        
+        Args:
+            table_name (str): Name of the table
+            key (str): Primary key value
+            data (dict): Non-key columns to write
+            timeout (float or tuple, optional): Per-request timeout override
+        """
+        response = self._request('PUT', self._key_url(table_name, key), json=data, timeout=timeout)
+        response.raise_for_status()
+        return response.json() if response.content else response.status_code
+
+    def get_row_by_key(self, table_name, key, timeout=None):
+        """
+        Retrieve a row by its primary key
+        
+        Returns:
+            dict: Row data if found, None if not found
+        """
+        response = self._request('GET', self._key_url(table_name, key), timeout=timeout)
+        return self._first_row(self._response_data(response))
+
+    def get_all_rows(self, table_name, page_size=BATCH_LOOKUP_SIZE, timeout=None):
+        """
+        Iterate over every row of a table, one page at a time
+        
+        Args:
+            table_name (str): Name of the table
+            page_size (int): Rows fetched per request
+            timeout (float or tuple, optional): Per-request timeout override
+            
+        Returns:
+            generator: Row dicts
+        """
+        params = {"page-size": page_size}
+        while params is not None:
+            response = self._request('GET', f"{self._table_url(table_name)}/rows", params=params, timeout=timeout)
+            data = self._response_data(response)
+            yield from data.get("data") or []
+            page_state = data.get("pageState")
+            params = dict(params, **{"page-state": page_state}) if page_state else None
+
+def get_client() -> AstraDBClient:
+    """
+    Return the shared AstraDB client used by the browser, CLI and batch jobs
+    
+    Returns:
+        AstraDBClient: Thread-safe client backed by the pooled session
+    """
+    global _default_client
+    if _default_client is None:
+        with _client_lock:
+            if _default_client is None:
+                _default_client = AstraDBClient()
+    return _default_client
+
+class AsyncAstraDBClient(_AstraDBRequests):
+    def __init__(self, client: httpx.AsyncClient = None, timeout=None, pool_size: int = POOL_SIZE):
+        """
+        asyncio variant of AstraDBClient for use on an event loop
+        
+        The underlying httpx client keeps a connection pool and is bound to the
+        event loop it is first used on.
+        """
+        self._configure()
+        self.timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+        connect_timeout, read_timeout = self.timeout if isinstance(self.timeout, tuple) else (self.timeout, self.timeout)
+        self.client = client or httpx.AsyncClient(
+            # httpx rejects None header values, e.g. when ASTRA_DB_APPLICATION_TOKEN is unset
+            headers={name: value for name, value in self.headers.items() if value is not None},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        # Event loop the client was created for, set by get_async_client
+        self.loop = None
+
+    async def _request(self, method, url, timeout=None, **kwargs):
+        """
+        Send a request through the pooled async client
+        """
+        if timeout is not None:
+            connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+            kwargs['timeout'] = httpx.Timeout(read_timeout, connect=connect_timeout)
+        return await self.client.request(method, url, **kwargs)
+
+    async def create_table(self, table_name, column_definitions, primary_key, timeout=None):
+        """
+        Create a table in the keyspace
+        """
+        payload = self._table_payload(table_name, column_definitions, primary_key)
+        response = await self._request('POST', self._schema_url(), json=payload, timeout=timeout)
+        return response.json() if response.content else response.status_code
+
+    async def add_row(self, table_name, data, timeout=None):
+        """
+        Add a row to the specified table
+        """
+        response = await self._request('POST', self._table_url(table_name), json=data, timeout=timeout)
+        return response.json() if response.content else response.status_code
+
+    async def get_row(self, table_name, url, timeout=None):
+        """
+        Retrieve a row from the specified table by searching for its URL
+        
+        Returns:
+            dict: Row data if found, None if not found
+        """
+        response = await self._request('GET', self._table_url(table_name), params=self._url_query(url), timeout=timeout)
+        return self._first_row(self._response_data(response))
+
+    async def add_rows(self, table_name, rows, max_workers=BATCH_WORKERS, timeout=None):
+        """
+        Add many rows with at most max_workers requests in flight
+        
+        Returns:
+            list: One result per row, in input order; failed rows hold the exception
+        """
+        return await self._map_concurrently(lambda row: self.add_row(table_name, row, timeout=timeout), rows, max_workers)
+
+    async def upsert_rows(self, table_name, keyed_rows, max_workers=BATCH_WORKERS, timeout=None):
+        """
+        Insert or replace many rows by primary key with at most max_workers requests in flight
+        
+        Returns:
+            list: One result per row, in input order; failed rows hold the exception
+        """
+        return await self._map_concurrently(
+            lambda item: self.upsert_row(table_name, item[0], item[1], timeout=timeout), keyed_rows, max_workers
+        )
+
+    @staticmethod
+    async def _map_concurrently(func, items, max_workers):
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def call(item):
+            async with semaphore:
+                try:
+                    return await func(item)
+                except httpx.HTTPError as e:
+                    return e
+
+        return list(await asyncio.gather(*(call(item) for item in items)))
+
+    async def get_rows(self, table_name, urls, batch_size=BATCH_LOOKUP_SIZE, max_workers=BATCH_WORKERS, timeout=None, column="url"):
+        """
+        Retrieve the rows for many URLs using $in queries
+        
+        Returns:
+            dict: Maps each URL to its row, or None if not found
+        """
+        urls = list(dict.fromkeys(urls))
+        batches = [urls[i:i + batch_size] for i in range(0, len(urls), batch_size)]
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def lookup(batch):
+            params, rows = self._in_query(column, batch), []
+            async with semaphore:
+                while params is not None:
+                    response = await self._request('GET', self._table_url(table_name), params=params, timeout=timeout)
+                    data = self._response_data(response)
+                    rows.extend(data.get("data") or [])
+                    params = self._next_page(params, data, batch, rows, column)
+            return rows
+
+        results = {url: None for url in urls}
+        for rows in await asyncio.gather(*(lookup(batch) for batch in batches)):
+            self._collect_first(results, rows, column)
+        return results
+
+    async def upsert_row(self, table_name, key, data, timeout=None):
+        """
+        Insert or replace the row with the given primary key
+        """
+        response = await self._request('PUT', self._key_url(table_name, key), json=data, timeout=timeout)
+        response.raise_for_status()
+        return response.json() if response.content else response.status_code
+
+    async def get_row_by_key(self, table_name, key, timeout=None):
+        """
+        Retrieve a row by its primary key
+        
+        Returns:
+            dict: Row data if found, None if not found
+        """
+        response = await self._request('GET', self._key_url(table_name, key), timeout=timeout)
+        return self._first_row(self._response_data(response))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+_async_client = None
+
+def get_async_client() -> AsyncAstraDBClient:
+    """
+    Return the shared async client for the running event loop
+    
+    Returns:
+        AsyncAstraDBClient: Client whose connection pool lives on the current loop
+    """
+    global _async_client
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.loop is not loop:
+        _async_client = AsyncAstraDBClient()
+        _async_client.loop = loop
+    return _async_client
+
+def template_digest(template_content: str) -> str:
+    """
+    Content address of a template body
+    
+    Args:
+        template_content (str): Template HTML
+        
+    Returns:
+        str: SHA-256 hex digest of the UTF-8 encoded template
+    """
+    return hashlib.sha256(template_content.encode('utf-8')).hexdigest()
+
+def compress_template(template_content: str) -> str:
+    """
+    Compress a template for storage in a text column
+    
+    Returns:
+        str: Base64 encoded zlib stream
+    """
+    return base64.b64encode(zlib.compress(template_content.encode('utf-8'), 9)).decode('ascii')
+
+def decompress_template(data: str) -> str:
+    """
+    Reverse compress_template
+    """
+    return zlib.decompress(base64.b64decode(data)).decode('utf-8')
+
+_TEMPLATE_TABLES = (
+    (URL_TABLE, [
+        {"name": "url", "typeDefinition": "text"},
+        {"name": "template_hash", "typeDefinition": "text"},
+        {"name": "created", "typeDefinition": "text"}
+    ], {"partitionKey": ["url"]}),
+    (BLOB_TABLE, [
+        {"name": "template_hash", "typeDefinition": "text"},
+        {"name": "template", "typeDefinition": "text"},
+        {"name": "encoding", "typeDefinition": "text"},
+        {"name": "size", "typeDefinition": "int"},
+        {"name": "created", "typeDefinition": "text"}
+    ], {"partitionKey": ["template_hash"]}),
+)
+
+def ensure_template_tables(timeout=None) -> list:
+    """
+    Create the content-addressed template tables if they do not exist
+    
+    Returns:
+        list: Responses of the create table calls
+    """
+    client = get_client()
+    return [client.create_table(table_name, column_definitions, primary_key, timeout=timeout)
+            for table_name, column_definitions, primary_key in _TEMPLATE_TABLES]
+
+def _ensure_tables_once(timeout=None):
+    """
+    Create the template tables before the first write of the process
+    """
+    global _tables_ready
+    if AUTO_CREATE_TABLES and not _tables_ready:
+        with _tables_lock:
+            if not _tables_ready:
+                ensure_template_tables(timeout=timeout)
+                _tables_ready = True
+
+async def _ensure_tables_once_async(client, timeout=None):
+    """
+    Async version of _ensure_tables_once; creating a table twice is harmless, so no lock is taken
+    """
+    global _tables_ready
+    if AUTO_CREATE_TABLES and not _tables_ready:
+        for table_name, column_definitions, primary_key in _TEMPLATE_TABLES:
+            await client.create_table(table_name, column_definitions, primary_key, timeout=timeout)
+        _tables_ready = True
+
+def _blob_row(template_content: str, created: str) -> dict:
+    return {
+        "template": compress_template(template_content),
+        "encoding": BLOB_ENCODING,
+        "size": len(template_content.encode('utf-8')),
+        "created": created
+    }
+
+def _decode_blob(blob: dict) -> str:
+    if blob.get("encoding") == BLOB_ENCODING:
+        return decompress_template(blob["template"])
+    return blob["template"]
+
+def _template_row(url: str, digest: str, created: str, template_content: str) -> dict:
+    return {"url": url, "template": template_content, "template_hash": digest, "created": created}
+
+def _known_template(digest: str, stale_row):
+    """
+    Return a template body already held locally for a digest, or None
+    """
+    if stale_row is not None and stale_row.get("template_hash") == digest:
+        return stale_row["template"]
+    return blob_cache.get(digest)
+
+def add_url_template_to_db(url: str, template_content: str, timeout=None) -> dict:
     """
     Add a URL and its template content to the database
     
+    The template body is stored once under its content digest and the URL is
+    mapped to that digest, replacing any previous mapping for the URL.
+    
     Args:
         url (str): The URL to cache
         template_content (str): The template content to store
+        timeout (float or tuple, optional): Per-request timeout override
         
     Returns:
         dict: Response from the database operation
     """
-    client = AstraDBClient()
+    client = get_client()
+    _ensure_tables_once(timeout)
+    digest = template_digest(template_content)
+    created = str(datetime.now().isoformat())
     
-    cache_data = {
-        "url": url,
-        "template": template_content,
-        "id": str(uuid4()),
-        "created": str(datetime.now().isoformat())
-    }
+    # Layouts already stored (or fetched) by this process are not uploaded again
+    if blob_cache.get(digest) is None:
+        client.upsert_row(BLOB_TABLE, digest, _blob_row(template_content, created), timeout=timeout)
+        blob_cache.set(digest, template_content)
+    result = client.upsert_row(URL_TABLE, url, {"template_hash": digest, "created": created}, timeout=timeout)
     
-    return client.add_row("url_cache_base3", cache_data)
+    _store_fetched(url, _template_row(url, digest, created, template_content), None, True)
+    return result
 
-def get_template_by_url(url: str) -> dict:
+def get_template_by_url(url: str, timeout=None, use_cache: bool = True) -> dict:
     """
     Retrieve a template entry by its URL
     
     Args:
         url (str): URL to retrieve the template for
+        timeout (float or tuple, optional): Per-request timeout override
+        use_cache (bool): Serve lookups from the in-process and on-disk caches
         
     Returns:
         dict: Template data if found, None if not found
     """
-    client = AstraDBClient()
-    return client.get_row("url_cache_base3", url)
+    hit, row, stale_row = _lookup_local(url, use_cache)
+    if hit:
+        return row
+    
+    client = get_client()
+    try:
+        row = _fetch_template_row(client, url, stale_row, timeout)
+    except requests.RequestException:
+        # Serve the stale disk copy rather than failing when AstraDB is unreachable
+        if stale_row is not None:
+            return stale_row
+        raise
+    
+    _store_fetched(url, row, stale_row, use_cache)
+    return row
+
+def _fetch_template_row(client, url: str, stale_row, timeout):
+    """
+    Resolve a URL to its template through the URL mapping and blob tables
+    """
+    mapping = client.get_row_by_key(URL_TABLE, url, timeout=timeout)
+    if mapping is None:
+        # Fall back to rows written before content-addressed storage
+        return client.get_row(LEGACY_TABLE, url, timeout=timeout)
+    
+    digest = mapping["template_hash"]
+    template_content = _known_template(digest, stale_row)
+    if template_content is None:
+        blob = client.get_row_by_key(BLOB_TABLE, digest, timeout=timeout)
+        if blob is None:
+            return None
+        template_content = _decode_blob(blob)
+        blob_cache.set(digest, template_content)
+    return _template_row(url, digest, mapping.get("created"), template_content)
+
+async def get_template_by_url_async(url: str, timeout=None, use_cache: bool = True) -> dict:
+    """
+    Retrieve a template entry by its URL without blocking the calling thread
+    
+    Cancelling the awaiting task abandons the request.
+    
+    Args:
+        url (str): URL to retrieve the template for
+        timeout (float or tuple, optional): Per-request timeout override
+        use_cache (bool): Serve lookups from the in-process and on-disk caches
+        
+    Returns:
+        dict: Template data if found, None if not found
+    """
+    hit, row, stale_row = _lookup_local(url, use_cache)
+    if hit:
+        return row
+    
+    client = get_async_client()
+    try:
+        mapping = await client.get_row_by_key(URL_TABLE, url, timeout=timeout)
+        if mapping is None:
+            row = await client.get_row(LEGACY_TABLE, url, timeout=timeout)
+        else:
+            digest = mapping["template_hash"]
+            template_content = _known_template(digest, stale_row)
+            if template_content is None:
+                blob = await client.get_row_by_key(BLOB_TABLE, digest, timeout=timeout)
+                if blob is not None:
+                    template_content = _decode_blob(blob)
+                    blob_cache.set(digest, template_content)
+            row = None if template_content is None else _template_row(url, digest, mapping.get("created"), template_content)
+    except httpx.HTTPError:
+        if stale_row is not None:
+            return stale_row
+        raise
+    
+    _store_fetched(url, row, stale_row, use_cache)
+    return row
+
+async def add_url_template_to_db_async(url: str, template_content: str, timeout=None) -> dict:
+    """
+    Add a URL and its template content to the database without blocking
+    
+    Returns:
+        dict: Response from the database operation
+    """
+    client = get_async_client()
+    await _ensure_tables_once_async(client, timeout)
+    digest = template_digest(template_content)
+    created = str(datetime.now().isoformat())
+    
+    if blob_cache.get(digest) is None:
+        await client.upsert_row(BLOB_TABLE, digest, _blob_row(template_content, created), timeout=timeout)
+        blob_cache.set(digest, template_content)
+    result = await client.upsert_row(URL_TABLE, url, {"template_hash": digest, "created": created}, timeout=timeout)
+    
+    _store_fetched(url, _template_row(url, digest, created, template_content), None, True)
+    return result
+
+def _lookup_local(url: str, use_cache: bool):
+    """
+    Check the in-process and on-disk caches for a URL
+    
+    Returns:
+        tuple: (hit, row, stale_row) where stale_row is a disk copy due for revalidation
+    """
+    if not use_cache:
+        return False, None, None
+    cached = template_cache.get(url)
+    if cached is MISSING:
+        return True, None, None
+    if cached is not None:
+        return True, cached, None
+    disk_cache = get_disk_cache()
+    if disk_cache:
+        stale_row, needs_revalidation = disk_cache.get(url)
+        if stale_row is not None and not needs_revalidation:
+            template_cache.set(url, stale_row)
+            return True, stale_row, None
+        return False, None, stale_row
+    return False, None, None
+
+def _same_template(stale_row: dict, row: dict) -> bool:
+    if stale_row.get('template_hash') and row.get('template_hash'):
+        return stale_row['template_hash'] == row['template_hash']
+    return stale_row.get('created') == row.get('created')
+
+def _store_fetched(url: str, row, stale_row, use_cache: bool):
+    """
+    Record a row fetched from AstraDB in the local caches
+    """
+    disk_cache = get_disk_cache() if use_cache else None
+    if disk_cache:
+        if row is None:
+            disk_cache.invalidate(url)
+        elif stale_row is not None and _same_template(stale_row, row):
+            # Unchanged since it was cached; keep the local copy and reset its clock
+            disk_cache.touch(url)
+        else:
+            disk_cache.set(url, row)
+    template_cache.set(url, row)
+
+def add_url_templates_to_db(items, max_workers: int = BATCH_WORKERS, timeout=None) -> list:
+    """
+    Add many URL/template pairs to the database
+    
+    Each distinct template body is uploaded once, however many URLs share it.
+    
+    Args:
+        items (list): (url, template_content) tuples
+        max_workers (int): Maximum number of concurrent requests
+        timeout (float or tuple, optional): Per-request timeout override
+        
+    Returns:
+        list: One database response (or exception) per item, in input order
+    """
+    client = get_client()
+    _ensure_tables_once(timeout)
+    created = str(datetime.now().isoformat())
+    digests = [template_digest(template_content) for _, template_content in items]
+    
+    unique_blobs = {}
+    for digest, (_, template_content) in zip(digests, items):
+        if digest not in unique_blobs and blob_cache.get(digest) is None:
+            unique_blobs[digest] = template_content
+    blob_results = client.upsert_rows(
+        BLOB_TABLE,
+        [(digest, _blob_row(template_content, created)) for digest, template_content in unique_blobs.items()],
+        max_workers=max_workers, timeout=timeout
+    )
+    failed_blobs = {}
+    for (digest, template_content), result in zip(unique_blobs.items(), blob_results):
+        if isinstance(result, Exception):
+            failed_blobs[digest] = result
+        else:
+            blob_cache.set(digest, template_content)
+    
+    # Only map URLs whose template body made it into the blob table
+    pending = [(url, digest) for (url, _), digest in zip(items, digests) if digest not in failed_blobs]
+    mapping_results = iter(client.upsert_rows(
+        URL_TABLE,
+        [(url, {"template_hash": digest, "created": created}) for url, digest in pending],
+        max_workers=max_workers, timeout=timeout
+    ))
+    
+    results = []
+    for (url, template_content), digest in zip(items, digests):
+        if digest in failed_blobs:
+            results.append(failed_blobs[digest])
+            continue
+        result = next(mapping_results)
+        if not isinstance(result, Exception):
+            _store_fetched(url, _template_row(url, digest, created, template_content), None, True)
+        results.append(result)
+    return results
+
+def get_templates_by_urls(urls, timeout=None, use_cache: bool = True) -> dict:
+    """
+    Retrieve template entries for many URLs, querying AstraDB only for cache misses
+    
+    Args:
+        urls (list): URLs to retrieve templates for
+        timeout (float or tuple, optional): Per-request timeout override
+        use_cache (bool): Serve lookups from the in-process and on-disk caches
+        
+    Returns:
+        dict: Maps each URL to its template data, or None if not found
+    """
+    results = {}
+    pending = {}
+    for url in dict.fromkeys(urls):
+        hit, row, stale_row = _lookup_local(url, use_cache)
+        if hit:
+            results[url] = row
+        else:
+            pending[url] = stale_row
+    if not pending:
+        return results
+    
+    client = get_client()
+    try:
+        fetched = _fetch_template_rows(client, pending, timeout)
+    except requests.RequestException:
+        # Serve stale disk copies rather than failing when AstraDB is unreachable; URLs
+        # without one are reported as None but not cached as missing
+        if not any(stale_row is not None for stale_row in pending.values()):
+            raise
+        results.update(pending)
+        return results
+    
+    for url, row in fetched.items():
+        _store_fetched(url, row, pending[url], use_cache)
+        results[url] = row
+    return results
+
+def _fetch_template_rows(client, pending: dict, timeout) -> dict:
+    """
+    Batch version of _fetch_template_row; pending maps each URL to its stale disk copy or None
+    """
+    mappings = client.get_rows(URL_TABLE, list(pending), timeout=timeout)
+    
+    # URLs without a mapping may still live in the legacy table
+    legacy_urls = [url for url, mapping in mappings.items() if mapping is None]
+    fetched = client.get_rows(LEGACY_TABLE, legacy_urls, timeout=timeout) if legacy_urls else {}
+    
+    # Download each missing template body once, however many URLs share it
+    templates = {}
+    for url, mapping in mappings.items():
+        if mapping is not None:
+            template_content = _known_template(mapping["template_hash"], pending[url])
+            if template_content is not None:
+                templates[mapping["template_hash"]] = template_content
+    missing = [mapping["template_hash"] for mapping in mappings.values()
+               if mapping is not None and mapping["template_hash"] not in templates]
+    if missing:
+        blobs = client.get_rows(BLOB_TABLE, missing, timeout=timeout, column="template_hash")
+        for digest, blob in blobs.items():
+            if blob is not None:
+                templates[digest] = _decode_blob(blob)
+                blob_cache.set(digest, templates[digest])
+    
+    for url, mapping in mappings.items():
+        if mapping is not None:
+            digest = mapping["template_hash"]
+            template_content = templates.get(digest)
+            fetched[url] = None if template_content is None else _template_row(url, digest, mapping.get("created"), template_content)
+    return fetched
+
+def migrate_legacy_templates(batch_size: int = BATCH_LOOKUP_SIZE, max_workers: int = BATCH_WORKERS, timeout=None) -> tuple:
+    """
+    Copy the rows of the legacy table into the content-addressed tables
+    
+    URLs that already have a mapping are left alone, since it is newer than their legacy row,
+    and only the first legacy row of each URL is copied, as lookups would return it. Running
+    it again is safe.
+    
+    Args:
+        batch_size (int): Legacy rows migrated per batch
+        max_workers (int): Maximum number of concurrent requests
+        timeout (float or tuple, optional): Per-request timeout override
+        
+    Returns:
+        tuple: (migrated, skipped, failed) URL counts
+    """
+    client = get_client()
+    _ensure_tables_once(timeout)
+    counts = {"migrated": 0, "skipped": 0, "failed": 0}
+    seen = set()
+    batch = []
+    
+    def flush():
+        mapped = client.get_rows(URL_TABLE, [url for url, _ in batch], timeout=timeout)
+        pending = [(url, template_content) for url, template_content in batch if mapped[url] is None]
+        counts["skipped"] += len(batch) - len(pending)
+        results = add_url_templates_to_db(pending, max_workers=max_workers, timeout=timeout) if pending else []
+        failed = sum(1 for result in results if isinstance(result, Exception))
+        counts["failed"] += failed
+        counts["migrated"] += len(pending) - failed
+        batch.clear()
+    
+    for row in client.get_all_rows(LEGACY_TABLE, timeout=timeout):
+        url = row.get("url")
+        if not url or url in seen or row.get("template") is None:
+            continue
+        seen.add(url)
+        batch.append((url, row["template"]))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return counts["migrated"], counts["skipped"], counts["failed"]
+
+def prefetch_templates(urls, timeout=None) -> int:
+    """
+    Warm the local caches for a list of domains, e.g. a user's most visited sites
+    
+    Args:
+        urls (list): URLs or domains to prefetch
+        timeout (float or tuple, optional): Per-request timeout override
+        
+    Returns:
+        int: Number of domains that have a template
+    """
+    found = get_templates_by_urls(urls, timeout=timeout)
+    return sum(1 for row in found.values() if row)
+
+def load_templates_from_dir(directory: str) -> list:
+    """
+    Load url/template pairs from a directory of HTML files named after their domain
+    
+    Args:
+        directory (str): Directory containing e.g. 'example.com.html'
+        
+    Returns:
+        list: (url, template_content) tuples
+    """
+    items = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in ('.html', '.htm'):
+            continue
+        with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+            items.append((stem, f.read()))
+    return items
+
+def load_templates_from_manifest(manifest_path: str) -> list:
+    """
+    Load url/template pairs from a JSONL manifest
+    
+    Each line holds {"url": ..., "template": ...} or {"url": ..., "template_file": ...};
+    relative template files are resolved against the manifest's directory.
+    
+    Args:
+        manifest_path (str): Path to the JSONL manifest
+        
+    Returns:
+        list: (url, template_content) tuples
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    items = []
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            template_content = entry.get("template")
+            if template_content is None:
+                with open(os.path.join(base_dir, entry["template_file"]), 'r', encoding='utf-8') as template_file:
+                    template_content = template_file.read()
+            items.append((entry["url"], template_content))
+    return items
 
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Add URL and template to AstraDB cache')
-    parser.add_argument('url', help='URL to cache')
-    parser.add_argument('template_file', help='Path to template file')
+    parser.add_argument('url', nargs='?', help='URL to cache')
+    parser.add_argument('template_file', nargs='?', help='Path to template file')
+    parser.add_argument('--dir', help='Directory of <domain>.html templates to insert')
+    parser.add_argument('--manifest', help='JSONL manifest of {"url", "template" | "template_file"} entries to insert')
+    parser.add_argument('--prefetch', help='File with one domain per line to look up and cache locally')
+    parser.add_argument('--create-tables', action='store_true', help='Create the content-addressed template tables')
+    parser.add_argument('--migrate-legacy', action='store_true', help=f'Copy {LEGACY_TABLE} rows into the content-addressed tables')
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help='Maximum concurrent requests for batch operations')
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE, help='Number of pooled connections to AstraDB')
+    parser.add_argument('--timeout', type=float, default=None, help='Per-request read timeout in seconds')
     
     args = parser.parse_args()
+    get_session(max(args.pool_size, args.workers))
+    timeout = (CONNECT_TIMEOUT, args.timeout) if args.timeout else None
+    
+    if args.create_tables:
+        print("Create tables result:", ensure_template_tables(timeout=timeout))
+        if not (args.migrate_legacy or args.prefetch or args.dir or args.manifest or args.url):
+            return
+    
+    if args.migrate_legacy:
+        migrated, skipped, failed = migrate_legacy_templates(max_workers=args.workers, timeout=timeout)
+        print(f"Migrated {migrated} legacy templates ({skipped} already mapped, {failed} failed)")
+        return
+    
+    if args.prefetch:
+        with open(args.prefetch, 'r') as f:
+            domains = [line.strip() for line in f if line.strip()]
+        found = prefetch_templates(domains, timeout=timeout)
+        print(f"Prefetched {found}/{len(domains)} templates")
+        return
+    
+    if args.dir or args.manifest:
+        items = load_templates_from_dir(args.dir) if args.dir else load_templates_from_manifest(args.manifest)
+        results = add_url_templates_to_db(items, max_workers=args.workers, timeout=timeout)
+        failed = [url for (url, _), result in zip(items, results) if isinstance(result, Exception)]
+        print(f"Inserted {len(items) - len(failed)}/{len(items)} templates")
+        for url in failed:
+            print(f"Failed to insert {url}")
+        return
+    
+    if not args.url or not args.template_file:
+        parser.error('url and template_file are required unless --dir, --manifest, --prefetch, --migrate-legacy or --create-tables is given')
     
     # Read template content from file
     try:
@@ -137,7 +1098,7 @@ def main():
         return
 
     # Add the data using the new function
-    result = add_url_template_to_db(args.url, template_content)
+    result = add_url_template_to_db(args.url, template_content, timeout=timeout)
     print("Row insertion result:", result)
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark the OpenAI Assistant round trip used by fix-html against a local fake Assistant server.
+
+Compares the original flow (new client per page, three setup requests, fixed 1s polling,
+one page at a time) with the shared-client adaptive polling in assistant_client, both
+sequentially and with concurrent runs.
+
+Usage: python bench_assistant.py --bodies 8 --latency 1.3 --limit 4
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai import AsyncOpenAI, OpenAI
+
+from assistant_client import process_bodies_async, run_assistant
+
+ANSWER = '```json\n{"tag": "article", "class": "post"}\n```'
+
+class FakeAssistantServer:
+    """
+    Minimal stand-in for the Assistants API: runs complete 'latency' seconds after creation.
+    """
+    def __init__(self, latency):
+        self.latency = latency
+        self.runs = {}
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def _new_id(self, prefix):
+        with self._lock:
+            return f"{prefix}_{next(self._ids)}"
+
+    def _run(self, run_id):
+        thread_id, created = self.runs[run_id]
+        status = "completed" if time.monotonic() - created >= self.latency else "in_progress"
+        return {"id": run_id, "object": "thread.run", "thread_id": thread_id, "assistant_id": "asst_fake",
+                "status": status, "created_at": int(time.time())}
+
+    def _start_run(self, thread_id):
+        run_id = self._new_id("run")
+        self.runs[run_id] = (thread_id, time.monotonic())
+        return self._run(run_id)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                server.requests += 1
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path == "/v1/threads/runs":
+                    return self._send(server._start_run(server._new_id("thread")))
+                if self.path == "/v1/threads":
+                    return self._send({"id": server._new_id("thread"), "object": "thread", "created_at": int(time.time())})
+                match = re.fullmatch(r"/v1/threads/([^/]+)/(messages|runs)", self.path)
+                if match and match.group(2) == "runs":
+                    return self._send(server._start_run(match.group(1)))
+                if match:
+                    return self._send({"id": server._new_id("msg"), "object": "thread.message",
+                                       "thread_id": match.group(1), "role": "user", "content": []})
+                self.send_error(404)
+
+            def do_GET(self):
+                server.requests += 1
+                path = self.path.split("?", 1)[0]
+                match = re.fullmatch(r"/v1/threads/([^/]+)/runs/([^/]+)", path)
+                if match:
+                    return self._send(server._run(match.group(2)))
+                match = re.fullmatch(r"/v1/threads/([^/]+)/messages", path)
+                if match:
+                    message = {"id": server._new_id("msg"), "object": "thread.message", "thread_id": match.group(1),
+                               "role": "assistant",
+                               "content": [{"type": "text", "text": {"value": ANSWER, "annotations": []}}]}
+                    return self._send({"object": "list", "data": [message], "has_more": False})
+                self.send_error(404)
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+
+def legacy_process(body_content, base_url):
+    """
+    The original process_with_assistant loop, kept here as the baseline.
+    """
+    client = OpenAI(api_key="fake", base_url=base_url)
+    thread = client.beta.threads.create()
+    client.beta.threads.messages.create(thread_id=thread.id, role="user", content=body_content)
+    run = client.beta.threads.runs.create(thread_id=thread.id, assistant_id="asst_fake")
+    while True:
+        run_status = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
+        if run_status.status == 'completed':
+            break
+        time.sleep(1)
+    messages = client.beta.threads.messages.list(thread_id=thread.id)
+    return re.search(r'```json\s*(.*?)\s*```', messages.data[0].content[0].text.value, re.DOTALL).group(1)
+
+def measure(name, server, func):
+    server.requests = 0
+    start = time.perf_counter()
+    results = func()
+    elapsed = time.perf_counter() - start
+    failures = sum(1 for result in results if isinstance(result, Exception) or not result)
+    return {"mode": name, "seconds": elapsed, "requests": server.requests, "failures": failures}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark assistant polling against a fake Assistant server")
+    parser.add_argument("--bodies", type=int, default=8, help="Number of page bodies to process")
+    parser.add_argument("--latency", type=float, default=1.3, help="Seconds each fake run takes to complete")
+    parser.add_argument("--limit", type=int, default=4, help="Concurrent runs for the async mode")
+    parser.add_argument("--body-file", help="HTML body to send (defaults to a small placeholder)")
+    args = parser.parse_args()
+
+    body = "<body><article class='post'>x</article></body>"
+    if args.body_file:
+        with open(args.body_file, 'r', encoding='utf-8') as f:
+            body = f.read()
+    bodies = [body] * args.bodies
+
+    server = FakeAssistantServer(args.latency)
+    server.start()
+    try:
+        shared = OpenAI(api_key="fake", base_url=server.base_url)
+
+        async def concurrent():
+            client = AsyncOpenAI(api_key="fake", base_url=server.base_url)
+            try:
+                return await process_bodies_async(bodies, args.limit, client=client, assistant_id="asst_fake")
+            finally:
+                await client.close()
+
+        results = [
+            measure("legacy", server, lambda: [legacy_process(b, server.base_url) for b in bodies]),
+            measure("adaptive", server, lambda: [run_assistant(b, shared, "asst_fake") for b in bodies]),
+            measure(f"async x{args.limit}", server, lambda: asyncio.run(concurrent())),
+        ]
+    finally:
+        server.stop()
+
+    print(f"{args.bodies} bodies, fake run latency {args.latency}s\n")
+    print(f"{'mode':<12} {'total s':>8} {'per body s':>11} {'requests':>9} {'failures':>9}")
+    for result in results:
+        print(f"{result['mode']:<12} {result['seconds']:>8.2f} {result['seconds'] / args.bodies:>11.2f} "
+              f"{result['requests']:>9} {result['failures']:>9}")
+
+if __name__ == "__main__":
+    main()
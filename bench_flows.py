@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compare the two-step (post-gen + build-html) and combined (post-gen-html) personalization paths.
+
+Runs both paths against a live Langflow server and reports end-to-end latency,
+request bytes and response bytes per render. The combined path needs a post-gen-html
+flow on the server; see "Langflow flows" in README.md for how to build it.
+
+Usage: python bench_flows.py example-fixed.html --runs 3
+"""
+import argparse
+import statistics
+import time
+
+from agents_stuff import build_html_from_posts, generate_social_posts, generate_posts_and_html
+from extract_template import extract_template_section, get_news_data
+from langflow_client import get_langflow_client
+
+DEFAULT_TRAITS = """Happiness: 7/10
+Excitement: 4/10
+Sarcasm: 8/10
+Professionalism: 6/10
+Humor: 5/10"""
+
+class TrafficCounter:
+    """
+    Counts bytes sent and received through the Langflow session via a response hook.
+    """
+    def __init__(self, session):
+        self.sent = 0
+        self.received = 0
+        session.hooks['response'].append(self._record)
+
+    def _record(self, response, *args, **kwargs):
+        body = response.request.body or b''
+        self.sent += len(body)
+        self.received += len(response.content)
+
+    def reset(self):
+        self.sent = self.received = 0
+
+def two_step(news_data, traits, template):
+    posts = generate_social_posts(news_data, traits)
+    return build_html_from_posts(posts, template)
+
+def combined(news_data, traits, template):
+    return generate_posts_and_html(news_data, traits, template)[1]
+
+def run_path(name, func, runs, counter, news_data, traits, template):
+    latencies, sent, received = [], [], []
+    for _ in range(runs):
+        counter.reset()
+        start = time.perf_counter()
+        func(news_data, traits, template)
+        latencies.append(time.perf_counter() - start)
+        sent.append(counter.sent)
+        received.append(counter.received)
+    return {
+        "path": name,
+        "median_s": statistics.median(latencies),
+        "min_s": min(latencies),
+        "sent_bytes": statistics.mean(sent),
+        "received_bytes": statistics.mean(received),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark two-step vs combined personalization flows")
+    parser.add_argument("html_file", help="HTML file with template section markers")
+    parser.add_argument("--runs", type=int, default=3, help="Renders per path")
+    parser.add_argument("--traits", default=DEFAULT_TRAITS, help="Personality traits text")
+    args = parser.parse_args()
+
+    template = extract_template_section(args.html_file)
+    if not template:
+        raise SystemExit("No template section found")
+    news_data = get_news_data()
+
+    client = get_langflow_client()
+    # Every run must reach the server, so bypass the result cache
+    client.cache = None
+    counter = TrafficCounter(client.session)
+
+    results = [
+        run_path("two-step", two_step, args.runs, counter, news_data, args.traits, template),
+        run_path("combined", combined, args.runs, counter, news_data, args.traits, template),
+    ]
+
+    print(f"{'path':<10} {'median s':>10} {'min s':>10} {'sent B':>10} {'recv B':>10}")
+    for result in results:
+        print(f"{result['path']:<10} {result['median_s']:>10.2f} {result['min_s']:>10.2f} "
+              f"{result['sent_bytes']:>10.0f} {result['received_bytes']:>10.0f}")
+    two, one = results
+    if one["median_s"]:
+        print(f"\nCombined speedup: {two['median_s'] / one['median_s']:.2f}x, "
+              f"bytes sent: {one['sent_bytes'] / max(two['sent_bytes'], 1):.0%} of two-step")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Compare HTML parser backends on a corpus of saved pages: parse, CSS select and serialize time.
+
+Every installed BeautifulSoup backend from html_parsers is measured, plus selectolax
+(parse/select/serialize only; it cannot feed the BeautifulSoup pipeline) and the streaming
+lxml scan used by fix-html --stream.
+
+Usage: python bench_parsers.py pages/ --selector "div.post" --repeat 3
+"""
+import argparse
+import os
+import time
+
+from html_parsers import available_parsers, iterparse_html, parse_html
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+def load_corpus(corpus_dir):
+    pages = []
+    for file_name in sorted(os.listdir(corpus_dir)):
+        if file_name.endswith(('.html', '.htm')):
+            path = os.path.join(corpus_dir, file_name)
+            with open(path, 'rb') as f:
+                pages.append((path, f.read().decode('utf-8', errors='ignore')))
+    return pages
+
+def best_of(repeat, func):
+    """
+    Run func repeat times and return (fastest seconds, last result).
+    """
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def bench_soup(backend, content, selector, repeat):
+    parse_s, soup = best_of(repeat, lambda: parse_html(content, backend))
+    select_s, matches = best_of(repeat, lambda: soup.select(selector))
+    serialize_s, _ = best_of(repeat, lambda: str(soup))
+    prettify_s, _ = best_of(repeat, soup.prettify)
+    return {"parse": parse_s, "select": select_s, "serialize": serialize_s, "prettify": prettify_s, "matches": len(matches)}
+
+def bench_selectolax(content, selector, repeat):
+    parse_s, tree = best_of(repeat, lambda: SelectolaxParser(content))
+    select_s, matches = best_of(repeat, lambda: tree.css(selector))
+    serialize_s, _ = best_of(repeat, lambda: tree.html)
+    return {"parse": parse_s, "select": select_s, "serialize": serialize_s, "prettify": None, "matches": len(matches)}
+
+def bench_stream(path, selector, repeat):
+    tag, _, class_name = selector.partition('.')
+
+    def scan():
+        # Count matching elements on close and free them, as the streaming detector does
+        count = 0
+        for _, element in iterparse_html(path, events=("end",)):
+            if element.tag == tag and (not class_name or class_name in element.get('class', '').split()):
+                count += 1
+            element.clear()
+        return count
+
+    parse_s, matches = best_of(repeat, scan)
+    return {"parse": parse_s, "select": None, "serialize": None, "prettify": None, "matches": matches}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends")
+    parser.add_argument("corpus_dir", help="Directory of saved .html pages")
+    parser.add_argument("--selector", default="div", help="tag or tag.class selector to time")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is kept")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus_dir)
+    if not pages:
+        raise SystemExit(f"No .html files in {args.corpus_dir}")
+    total_bytes = sum(len(content.encode('utf-8')) for _, content in pages)
+    print(f"{len(pages)} pages, {total_bytes / 1024:.0f} KiB, selector '{args.selector}', best of {args.repeat}\n")
+
+    backends = available_parsers()
+    if SelectolaxParser is not None:
+        backends.append("selectolax")
+    try:
+        import lxml  # noqa: F401
+        backends.append("lxml-stream")
+    except ImportError:
+        pass
+
+    stages = ("parse", "select", "serialize", "prettify")
+    print(f"{'backend':<14}" + "".join(f"{stage + ' ms':>14}" for stage in stages) + f"{'total ms':>12}{'matches':>9}")
+    for backend in backends:
+        totals = dict.fromkeys(stages, 0.0)
+        measured = set()
+        matches = 0
+        for path, content in pages:
+            if backend == "selectolax":
+                result = bench_selectolax(content, args.selector, args.repeat)
+            elif backend == "lxml-stream":
+                result = bench_stream(path, args.selector, args.repeat)
+            else:
+                result = bench_soup(backend, content, args.selector, args.repeat)
+            matches += result["matches"]
+            for stage in stages:
+                if result[stage] is not None:
+                    totals[stage] += result[stage]
+                    measured.add(stage)
+        cells = "".join(f"{totals[stage] * 1000:>14.1f}" if stage in measured else f"{'-':>14}" for stage in stages)
+        total = sum(totals[stage] for stage in ("parse", "select", "serialize"))
+        print(f"{backend:<14}{cells}{total * 1000:>12.1f}{matches:>9}")
+
+if __name__ == "__main__":
+    main()
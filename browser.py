@@ -7,7 +7,7 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget,
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtGui import QColor, QPalette, QFont, QIcon, QPainter
 from urllib.parse import urlparse
-from astradb_access import get_template_by_url
+from astradb_access import get_template_by_url_async
 import pygame
 import numpy as np
 from matplotlib.figure import Figure
@@ -16,10 +16,12 @@ import random
 import os
 import json
 from pathlib import Path
-from extract_template import generate_personalized_content
-from PyQt6.QtCore import QPropertyAnimation, QPoint, QEasingCurve, QObject, QEvent, QThread
+from extract_template import stream_personalized_html_async
+from gather_news import get_news_refresher, get_news_snapshot
+from PyQt6.QtCore import QPropertyAnimation, QPoint, QEasingCurve, QObject, QEvent, QThread, pyqtSignal
 from generate_code import get_code_from_screenshot
 import asyncio
+import threading
 import websockets
 import qasync
 from podcast_talk import PodcastTalk
@@ -251,21 +253,29 @@ class AsyncHelper(QObject):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.loop = None
+        self.loop_ready = threading.Event()
         
     def setup_event_loop(self):
-        # Create and set the event loop
+        # Create the event loop and keep it running on this thread until stop() is called
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
+        self.loop_ready.set()
+        self.loop.run_forever()
         
     def run_async(self, coro):
         """Run an async coroutine from a synchronous context"""
-        if self.loop is None:
-            self.setup_event_loop()
+        # Wait for the loop thread to come up if it has just been started
+        self.loop_ready.wait()
             
-        # Create a future to get the result
+        # Create a future to get the result; cancelling it cancels the coroutine
         future = asyncio.run_coroutine_threadsafe(coro, self.loop)
         return future
 
+    def stop(self):
+        """Stop the event loop so its thread can finish"""
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
 class PersonalitySlider(QWidget):
     def __init__(self, trait_name, parent=None):
         super().__init__(parent)
@@ -320,13 +330,18 @@ class PersonalitySlider(QWidget):
         self.slider.setValue(value)
 
 class Browser(QMainWindow):
+    # Emitted from the async thread when a template lookup finishes: (navigation id, url, template row)
+    template_lookup_finished = pyqtSignal(int, str, object)
+    # Emitted from the async thread as personalized HTML streams in: (navigation id, page html, done)
+    personalized_html_ready = pyqtSignal(int, str, bool)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle('Modern Web Browser')
         self.setGeometry(100, 100, 1400, 800)
         
-        # Create async helper
-        self.async_helper = AsyncHelper(self)
+        # Create async helper (no parent, so it can be moved to the loop thread)
+        self.async_helper = AsyncHelper()
         
         # Start the event loop in a separate thread
         self.async_thread = QThread()
@@ -334,6 +349,17 @@ class Browser(QMainWindow):
         self.async_thread.started.connect(self.async_helper.setup_event_loop)
         self.async_thread.start()
         
+        # Track the in-flight template lookup so a newer navigation can cancel it
+        self.navigation_id = 0
+        self.pending_lookup = None
+        self.template_lookup_finished.connect(self.on_template_lookup_finished)
+        self.personalized_html_ready.connect(self.on_personalized_html_ready)
+        
+        # Keep headlines fresh in the background so personalization never waits on the news fetch
+        self.news_refresher = get_news_refresher().start()
+        # Article store version each domain was last personalized with, so revisits are fed only new stories
+        self.news_versions = {}
+        
         # Path for personality traits JSON file
         self.personality_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'personality_traits.json')
         
@@ -601,8 +627,12 @@ class Browser(QMainWindow):
         self.auto_generate_enabled = True
 
     def __del__(self):
+        # Stop the background news refresher
+        if hasattr(self, 'news_refresher'):
+            self.news_refresher.stop()
         # Clean up the async thread when the browser is closed
         if hasattr(self, 'async_thread') and self.async_thread.isRunning():
+            self.async_helper.stop()
             self.async_thread.quit()
             self.async_thread.wait()
 
@@ -636,42 +666,51 @@ class Browser(QMainWindow):
         # Show loading overlay
         self.showLoading()
         
-        # Check if domain exists in AstraDB
-        cached_data = None
-        for i in range(0,3):
-            try:
-                cached_data = get_template_by_url(domain)
-                break
-            except:
-                continue
+        # Cancel the lookup of a previous navigation that has not finished yet
+        if self.pending_lookup is not None:
+            self.pending_lookup.cancel()
+        self.navigation_id += 1
+        navigation_id = self.navigation_id
+        
+        async def lookup_template():
+            # Check if domain exists in AstraDB
+            for i in range(0,3):
+                try:
+                    return await get_template_by_url_async(domain)
+                except Exception:
+                    continue
+            return None
+        
+        # Run the lookup on the async loop so the GUI thread keeps painting
+        future = self.async_helper.run_async(lookup_template())
+        future.add_done_callback(lambda f: self._emit_template_lookup(f, navigation_id, url))
+        self.pending_lookup = future
+
+    def _emit_template_lookup(self, future, navigation_id, url):
+        # Runs on the async thread; hand the result back to the GUI thread via the signal
+        if future.cancelled():
+            return
+        try:
+            cached_data = future.result()
+        except Exception:
+            cached_data = None
+        self.template_lookup_finished.emit(navigation_id, url, cached_data)
+
+    def on_template_lookup_finished(self, navigation_id, url, cached_data):
+        # Ignore results for navigations the user has already moved away from
+        if navigation_id != self.navigation_id:
+            return
+        self.pending_lookup = None
         
         if cached_data and 'template' in cached_data:
-            # Save template to a temporary file
-            temp_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp_template.html')
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                f.write(cached_data['template'])
-            
             # Get personality traits
             personality_traits = self.get_personality_traits_text()
             
-            # Generate personalized content
-            generated_file = generate_personalized_content(temp_file, personality_traits)
-            
-            if generated_file:
-                # Read the generated file and display it
-                with open(generated_file, 'r', encoding='utf-8') as f:
-                    generated_html = f.read()
-                self.web_view.setHtml(generated_html)
-                
-                # Clean up temporary files
-                try:
-                    os.remove(temp_file)
-                    os.remove(generated_file)
-                except:
-                    pass
-            else:
-                # Fallback to original template if generation fails
-                self.web_view.setHtml(cached_data['template'])
+            # Generate personalized content on the async loop, showing the page as it streams in
+            self.pending_lookup = self.async_helper.run_async(
+                self.stream_personalized_page(navigation_id, cached_data['template'], personality_traits,
+                                              cached_data.get('url'))
+            )
             
             self.url_bar.setText(url)
             self.url_bar.setCursorPosition(0)
@@ -686,8 +725,40 @@ class Browser(QMainWindow):
                 # Connect the loadFinished signal to take_screenshot function
                 self.web_view.loadFinished.connect(self.take_screenshot_after_fallback)
             
-        # Hide loading overlay
+            # Hide loading overlay
+            self.hideLoading()
+
+    async def stream_personalized_page(self, navigation_id, template_html, personality_traits, domain=None):
+        """Generate the personalized page and hand each partial render to the GUI thread."""
+        # The whole personalization path runs in memory, so overlapping navigations cannot clash
+        page_html = None
+        try:
+            news_snapshot = await asyncio.to_thread(get_news_snapshot)
+            since_version = self.news_versions.get(domain)
+            async for page_html, done in stream_personalized_html_async(template_html, personality_traits,
+                                                                        news_snapshot, since_version):
+                self.personalized_html_ready.emit(navigation_id, page_html, done)
+            if domain and page_html is not None:
+                self.news_versions[domain] = news_snapshot.store_version
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error generating personalized content: {str(e)}")
+            page_html = None
+        
+        if page_html is None:
+            # Fallback to original template if generation fails
+            self.personalized_html_ready.emit(navigation_id, template_html, True)
+
+    def on_personalized_html_ready(self, navigation_id, page_html, done):
+        # Ignore output for navigations the user has already moved away from
+        if navigation_id != self.navigation_id:
+            return
+        self.web_view.setHtml(page_html)
+        # The first partial page replaces the loading overlay
         self.hideLoading()
+        if done:
+            self.pending_lookup = None
         
     def take_screenshot_after_fallback(self, success):
         # Only take screenshot if the flag is set and page loaded successfully
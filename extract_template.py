@@ -1,53 +1,60 @@
-from agents_stuff import build_html_from_posts, generate_social_posts
-from gather_news import NewsAPI
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import time
+from agents_stuff import (build_html_from_posts, generate_social_posts, build_html_from_posts_async,
+                          generate_social_posts_async, stream_html_from_posts, stream_html_from_posts_async,
+                          generate_posts_and_html, generate_posts_and_html_async,
+                          build_fill_data_from_posts, build_fill_data_from_posts_async)
+from template_engine import compile_section, compile_page, load_compiled_template
+from langflow_client import fan_out
+from gather_news import get_news_snapshot, get_article_store, format_news_data
 
 def extract_template_section(html_file_path):
     """
     Extract HTML content between template section comments from a file.
     
+    The file is compiled once and reused until it changes on disk.
+    
     Args:
         html_file_path (str): Path to the HTML file
         
     Returns:
         str: The HTML content between template section markers, or None if not found
     """
-    encodings = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
-    
-    for encoding in encodings:
-        try:
-            with open(html_file_path, 'r', encoding=encoding) as file:
-                content = file.read()
-                
-            start_marker = "<!-- Template section start -->"
-            end_marker = "<!-- Template section end -->"
-            
-            start_index = content.find(start_marker)
-            if start_index == -1:
-                continue
-                
-            # Add length of start marker to get to the actual content
-            start_index += len(start_marker)
-            
-            end_index = content.find(end_marker, start_index)
-            if end_index == -1:
-                continue
-                
-            # Extract the content between markers
-            template_content = content[start_index:end_index].strip()
-            return template_content
-            
-        except FileNotFoundError:
-            print(f"Error: File {html_file_path} not found")
-            return None
-        except UnicodeDecodeError:
-            # Try the next encoding
-            continue
-        except Exception as e:
-            print(f"Error: An unexpected error occurred: {str(e)}")
-            return None
+    try:
+        return load_compiled_template(html_file_path).section
+    except FileNotFoundError:
+        print(f"Error: File {html_file_path} not found")
+        return None
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return None
+    except Exception as e:
+        print(f"Error: An unexpected error occurred: {str(e)}")
+        return None
+
+def extract_template_sections(html_file_path):
+    """
+    Extract every named template section from a file.
     
-    print(f"Error: Could not read the file with any of the attempted encodings: {', '.join(encodings)}")
-    return None
+    Args:
+        html_file_path (str): Path to the HTML file
+        
+    Returns:
+        dict: Section name to its HTML content, in document order, or None if not found
+    """
+    try:
+        return dict(load_compiled_template(html_file_path).sections)
+    except FileNotFoundError:
+        print(f"Error: File {html_file_path} not found")
+        return None
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return None
 
 def replace_template_section(original_file_path, new_content, output_file_path=None):
     """
@@ -55,26 +62,15 @@ def replace_template_section(original_file_path, new_content, output_file_path=N
     
     Args:
         original_file_path (str): Path to the original HTML file
-        new_content (str): New HTML content to replace the template section with
+        new_content (str or dict): New HTML content for the first template section, or a
+            mapping of section name to new content to replace several sections at once
         output_file_path (str, optional): Path for the output file. If None, generates a name with '_generated' suffix
         
     Returns:
         tuple: (bool, str) - (Success status, Output file path or error message)
     """
     try:
-        with open(original_file_path, 'r', encoding='utf-8') as file:
-            original_content = file.read()
-        
-        # Replace the template section in the original content
-        start_marker = "<!-- Template section start -->"
-        end_marker = "<!-- Template section end -->"
-        start_index = original_content.find(start_marker)
-        end_index = original_content.find(end_marker) + len(end_marker)
-        
-        if start_index == -1 or end_index == -1:
-            return False, "Could not find template markers in the original file"
-            
-        new_html = original_content[:start_index] + start_marker + "\n" + new_content + "\n" + end_marker + original_content[end_index:]
+        new_html = load_compiled_template(original_file_path).render(new_content)
         
         # Generate output file path if not provided
         if output_file_path is None:
@@ -86,44 +82,286 @@ def replace_template_section(original_file_path, new_content, output_file_path=N
         
         return True, output_file_path
         
+    except ValueError as e:
+        return False, str(e)
     except Exception as e:
         return False, f"Error while replacing template: {str(e)}"
 
-def generate_personalized_content(html_file_path, personality_traits):
+def extract_template_section_from_string(page_html):
+    """
+    Extract HTML content between template section comments from a page held in memory.
+    
+    Args:
+        page_html (str or bytes): Full page HTML
+        
+    Returns:
+        str: The HTML content between template section markers, or None if not found
+    """
+    try:
+        return compile_page(page_html).section
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return None
+
+def extract_template_sections_from_string(page_html):
+    """
+    Extract every named template section from a page held in memory.
+    
+    Args:
+        page_html (str or bytes): Full page HTML
+        
+    Returns:
+        dict: Section name to its HTML content, in document order, or None if not found
+    """
+    try:
+        return dict(compile_page(page_html).sections)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return None
+
+def replace_template_section_in_string(page_html, new_content):
+    """
+    Replace the template section of a page held in memory.
+    
+    Args:
+        page_html (str or bytes): Full page HTML
+        new_content (str or dict): New HTML content for the first template section, or a
+            mapping of section name to new content
+        
+    Returns:
+        str: The page with the new template sections, or None if the markers are missing
+    """
+    try:
+        return compile_page(page_html).render(new_content)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        return None
+
+class PageAssembler:
+    """
+    Rebuilds a page around template sections that are still being generated.
+    """
+    def __init__(self, compiled, min_interval=0.3):
+        """
+        Args:
+            compiled (CompiledTemplate): Page split around its template sections
+            min_interval (float): Minimum seconds between two partial pages
+        """
+        self.compiled = compiled
+        self.min_interval = min_interval
+        # Sections stay empty until their first chunk arrives
+        self.chunks = {name: [] for name in compiled.names}
+        self._last_emit = 0.0
+
+    def add(self, chunk, name=None):
+        """
+        Append a generated chunk.
+        
+        Args:
+            chunk (str): Generated HTML text
+            name (str, optional): Section the chunk belongs to; defaults to the first section
+        
+        Returns:
+            bool: True if enough time has passed that a partial page should be shown
+        """
+        self.chunks[name or self.compiled.names[0]].append(chunk)
+        now = time.monotonic()
+        if now - self._last_emit >= self.min_interval:
+            self._last_emit = now
+            return True
+        return False
+
+    def page(self):
+        return self.compiled.render({name: "".join(chunks) for name, chunks in self.chunks.items()})
+
+def stream_personalized_content(html_file_path, personality_traits, news_snapshot=None, since_version=None):
+    """
+    Generate personalized content, yielding the page as the HTML flow streams it.
+    
+    Partial pages are throttled so the caller is not asked to re-render on every token.
+    
+    Args:
+        html_file_path (str): Path to the HTML template file
+        personality_traits (str): String containing personality traits
+        news_snapshot (NewsSnapshot, optional): Headlines to use; defaults to the shared snapshot
+        since_version (int, optional): Only feed articles first seen after this article store version
+        
+    Returns:
+        generator: (page_html, done) tuples; the last one has done=True and the complete page
+    """
+    return _stream_compiled(load_compiled_template(html_file_path), personality_traits, news_snapshot, since_version)
+
+def stream_personalized_html(page_html, personality_traits, news_snapshot=None, since_version=None):
+    """
+    In-memory version of stream_personalized_content; takes the page HTML instead of a file path.
+    
+    Raises:
+        ValueError: If the page has no template section markers
+    """
+    return _stream_compiled(compile_page(page_html), personality_traits, news_snapshot, since_version)
+
+def _stream_compiled(compiled, personality_traits, news_snapshot, since_version):
+    assembler = PageAssembler(compiled)
+    posts = generate_social_posts(get_news_data(news_snapshot, since_version), personality_traits)
+    # Sections are streamed one after another from the same posts
+    for name, template in compiled.sections.items():
+        for chunk in stream_html_from_posts(posts, template):
+            if assembler.add(chunk, name):
+                yield assembler.page(), False
+    yield assembler.page(), True
+
+def stream_personalized_content_async(html_file_path, personality_traits, news_snapshot=None, since_version=None):
+    """
+    Async version of stream_personalized_content.
+    
+    Returns:
+        async generator: (page_html, done) tuples; the last one has done=True and the complete page
+    """
+    return _stream_compiled_async(load_compiled_template(html_file_path), personality_traits, news_snapshot, since_version)
+
+def stream_personalized_html_async(page_html, personality_traits, news_snapshot=None, since_version=None):
+    """
+    Async version of stream_personalized_html.
+    
+    Raises:
+        ValueError: If the page has no template section markers
+    """
+    return _stream_compiled_async(compile_page(page_html), personality_traits, news_snapshot, since_version)
+
+async def _stream_compiled_async(compiled, personality_traits, news_snapshot, since_version):
+    assembler = PageAssembler(compiled)
+    news_data = await asyncio.to_thread(get_news_data, news_snapshot, since_version)
+    posts = await generate_social_posts_async(news_data, personality_traits)
+    for name, template in compiled.sections.items():
+        async for chunk in stream_html_from_posts_async(posts, template):
+            if assembler.add(chunk, name):
+                yield assembler.page(), False
+    yield assembler.page(), True
+
+def generate_personalized_content(html_file_path, personality_traits, news_snapshot=None, since_version=None, combined=False, structured=False):
     """
     Generate personalized content based on news articles and personality traits.
     
+    Every template section of the page is filled from the same set of posts.
+    
     Args:
         html_file_path (str): Path to the HTML template file
         personality_traits (str): String containing personality traits
+        news_snapshot (NewsSnapshot, optional): Headlines to use; defaults to the shared snapshot
+        since_version (int, optional): Only feed articles first seen after this article store
+            version (see NewsSnapshot.store_version); falls back to the full snapshot if none are new
+        combined (bool): Produce the posts and the HTML in one flow run instead of two
+        structured (bool): Have the flow return only the text of each post card as JSON and
+            fill the template locally instead of regenerating its HTML
         
     Returns:
         str: Path to the generated HTML file, or None if an error occurred
     """
-    # Extract template from the HTML file
-    template = extract_template_section(html_file_path)
-    if not template:
+    # Extract the template sections from the HTML file
+    templates = extract_template_sections(html_file_path)
+    if not templates:
         print("No template section found or an error occurred")
         return None
+    
+    contents = _generate_sections(templates, personality_traits, news_snapshot, since_version, combined, structured)
+    
+    # Replace template sections and save to new file
+    return _save_generated(html_file_path, contents)
+
+def generate_personalized_html(page_html, personality_traits, news_snapshot=None, since_version=None, combined=False, structured=False):
+    """
+    In-memory version of generate_personalized_content; nothing is read from or written to disk.
+    
+    Args:
+        page_html (str or bytes): Full page HTML containing the template section markers
+        personality_traits (str): String containing personality traits
         
-    # Get news articles
-    news_api = NewsAPI()
-    entertainment_articles = news_api.get_articles('entertainment')
-    general_articles = news_api.get_articles('general')
+    Returns:
+        str: The personalized page, or None if an error occurred
+    """
+    templates = extract_template_sections_from_string(page_html)
+    if not templates:
+        print("No template section found or an error occurred")
+        return None
     
-    # Format news data
-    news_data = ""
-    for article in entertainment_articles + general_articles:
-        news_data += f"\n{article['title']}\n"
-        news_data += f"Source: {article['source']['name']}\n"
-        news_data += f"Description: {article['description']}\n"
+    contents = _generate_sections(templates, personality_traits, news_snapshot, since_version, combined, structured)
+    return compile_page(page_html).render(contents)
+
+def _generate_sections(templates, personality_traits, news_snapshot, since_version, combined, structured):
+    news_data = get_news_data(news_snapshot, since_version)
+    contents = {}
+    remaining = dict(templates)
 
     # Generate posts and build HTML
-    posts = generate_social_posts(news_data, personality_traits)
-    html_content = build_html_from_posts(posts, template)
+    if combined:
+        # The combined flow fills the first section; the others reuse its posts
+        name, template = next(iter(templates.items()))
+        posts, contents[name] = generate_posts_and_html(news_data, personality_traits, template)
+        del remaining[name]
+    else:
+        posts = generate_social_posts(news_data, personality_traits)
+    for name, template in remaining.items():
+        contents[name] = render_structured(posts, template) if structured else build_html_from_posts(posts, template)
+    return contents
 
-    # Replace template section and save to new file
-    success, result = replace_template_section(html_file_path, html_content)
+def get_news_data(news_snapshot=None, since_version=None):
+    """
+    Format the headlines fed to the post generation flow.
+    
+    Args:
+        news_snapshot (NewsSnapshot, optional): Headlines to use; defaults to the shared snapshot
+        since_version (int, optional): Only include articles first seen after this article store version
+        
+    Returns:
+        str: Formatted news data
+    """
+    # Get news articles from the shared snapshot (kept fresh in the background when running)
+    if news_snapshot is None:
+        news_snapshot = get_news_snapshot()
+    categories = ['entertainment', 'general']
+    articles = news_snapshot.all_articles(categories)
+    if since_version is not None and articles:
+        # Never feed more than the snapshot would; an old since_version would otherwise pull in every stored article
+        articles = get_article_store().since(since_version, categories, limit=len(articles), newest=True) or articles
+    return format_news_data(articles)
+
+def render_structured(posts, template):
+    """
+    Fill the template locally from the slot values the flow returns for each post.
+    
+    Falls back to regenerating the HTML with the model if its answer is not usable JSON.
+    
+    Args:
+        posts (str): Generated social media posts
+        template (str): HTML of the template section
+        
+    Returns:
+        str: HTML with one filled copy of the template per post
+    """
+    section = compile_section(template)
+    if not section.slots:
+        return build_html_from_posts(posts, template)
+    try:
+        return section.render_many(build_fill_data_from_posts(posts, section.schema()))
+    except (ValueError, KeyError) as e:
+        print(f"Structured fill failed, regenerating HTML instead: {str(e)}")
+        return build_html_from_posts(posts, template)
+
+async def render_structured_async(posts, template):
+    """
+    Async version of render_structured.
+    """
+    section = compile_section(template)
+    if not section.slots:
+        return await build_html_from_posts_async(posts, template)
+    try:
+        return section.render_many(await build_fill_data_from_posts_async(posts, section.schema()))
+    except (ValueError, KeyError) as e:
+        print(f"Structured fill failed, regenerating HTML instead: {str(e)}")
+        return await build_html_from_posts_async(posts, template)
+
+def _save_generated(html_file_path, contents):
+    success, result = replace_template_section(html_file_path, contents)
     
     if success:
         print(f"Generated HTML saved to: {result}")
@@ -132,17 +370,267 @@ def generate_personalized_content(html_file_path, personality_traits):
         print(f"Error: {result}")
         return None
 
-# Example usage:
-if __name__ == "__main__":
-    import sys
+async def generate_personalized_content_async(html_file_path, personality_traits, news_snapshot=None, since_version=None, combined=False, structured=False):
+    """
+    Async version of generate_personalized_content; the flow calls do not block the event loop.
+    
+    Returns:
+        str: Path to the generated HTML file, or None if an error occurred
+    """
+    templates = extract_template_sections(html_file_path)
+    if not templates:
+        print("No template section found or an error occurred")
+        return None
+    
+    contents = await _generate_sections_async(templates, personality_traits, news_snapshot, since_version, combined, structured)
+    return _save_generated(html_file_path, contents)
+
+async def generate_personalized_html_async(page_html, personality_traits, news_snapshot=None, since_version=None, combined=False, structured=False):
+    """
+    Async version of generate_personalized_html.
+    
+    Returns:
+        str: The personalized page, or None if an error occurred
+    """
+    templates = extract_template_sections_from_string(page_html)
+    if not templates:
+        print("No template section found or an error occurred")
+        return None
     
-    # If a file path is provided as command line argument, use that
-    if len(sys.argv) > 1:
-        file_path = sys.argv[1]
+    contents = await _generate_sections_async(templates, personality_traits, news_snapshot, since_version, combined, structured)
+    return compile_page(page_html).render(contents)
+
+async def _generate_sections_async(templates, personality_traits, news_snapshot, since_version, combined, structured):
+    # Reading the snapshot may fetch news when no background refresher is running
+    news_data = await asyncio.to_thread(get_news_data, news_snapshot, since_version)
+    contents = {}
+    remaining = dict(templates)
+    if combined:
+        name, template = next(iter(templates.items()))
+        posts, contents[name] = await generate_posts_and_html_async(news_data, personality_traits, template)
+        del remaining[name]
     else:
-        # Default example file path if none provided
-        file_path = "example-fixed.html"
+        posts = await generate_social_posts_async(news_data, personality_traits)
+    # Sections are independent once the posts exist, so build them concurrently
+    render = render_structured_async if structured else build_html_from_posts_async
+    results = await asyncio.gather(*(render(posts, template) for template in remaining.values()))
+    contents.update(zip(remaining, results))
+    return contents
+
+async def generate_personalized_pages_async(html_file_paths, personality_traits, limit=4):
+    """
+    Personalize several pages concurrently, sharing one news snapshot.
+    
+    Each page still runs its posts and HTML flows in sequence, but pages run side by side,
+    so total time tracks the slowest page rather than the sum of all of them.
+    
+    Args:
+        html_file_paths (list): Paths to the HTML template files
+        personality_traits (str): String containing personality traits
+        limit (int): Maximum number of pages in flight
+        
+    Returns:
+        list: Generated file path (or None) per input file, in input order
+    """
+    news_snapshot = await asyncio.to_thread(get_news_snapshot)
+    results = await fan_out(
+        [lambda path=path: generate_personalized_content_async(path, personality_traits, news_snapshot)
+         for path in html_file_paths],
+        limit=limit,
+        return_exceptions=True
+    )
+    generated = []
+    for path, result in zip(html_file_paths, results):
+        if isinstance(result, Exception):
+            print(f"Error personalizing {path}: {result}")
+            result = None
+        generated.append(result)
+    return generated
+
+def format_personality_traits(traits):
+    """
+    Format a trait mapping the way the browser's sliders do.
+    
+    Args:
+        traits (dict or str): Trait name to 0-10 value, or already formatted text
+        
+    Returns:
+        str: One "Name: value/10" line per trait
+    """
+    if isinstance(traits, str):
+        return traits
+    return "\n".join(f"{name}: {value}/10" for name, value in traits.items())
+
+def load_trait_profiles(profiles_path):
+    """
+    Load personality profiles from a JSONL file.
+    
+    Each line is either {"name": ..., "traits": {...}} or a bare trait mapping such as
+    personality_traits.json; unnamed profiles are numbered by line.
+    
+    Args:
+        profiles_path (str): Path to the JSONL file
+        
+    Returns:
+        list: (profile_name, personality_traits_text) tuples
+    """
+    profiles = []
+    with open(profiles_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, dict) and "traits" in entry:
+                name, traits = entry.get("name") or f"profile{len(profiles)}", entry["traits"]
+            else:
+                name, traits = f"profile{len(profiles)}", entry
+            profiles.append((name, format_personality_traits(traits)))
+    return profiles
+
+def load_batch_templates(template_dir=None, manifest_path=None, urls_path=None):
+    """
+    Collect the pages to personalize.
+    
+    Args:
+        template_dir (str, optional): Directory of .html pages with template section markers
+        manifest_path (str, optional): AstraDB export, a JSONL manifest of {"url", "template" | "template_file"}
+        urls_path (str, optional): File with one URL per line whose templates are fetched from AstraDB
+        
+    Returns:
+        list: (template_name, page_html) tuples
+    """
+    templates = []
+    if template_dir:
+        for file_name in sorted(os.listdir(template_dir)):
+            if file_name.endswith('.html') and not file_name.endswith('_generated.html'):
+                with open(os.path.join(template_dir, file_name), 'rb') as f:
+                    templates.append((file_name[:-len('.html')], f.read()))
+    if manifest_path or urls_path:
+        # Only batch runs over AstraDB content need its client
+        from astradb_access import load_templates_from_manifest, get_templates_by_urls
+        if manifest_path:
+            templates.extend(load_templates_from_manifest(manifest_path))
+        if urls_path:
+            with open(urls_path, 'r', encoding='utf-8') as f:
+                urls = [line.strip() for line in f if line.strip()]
+            rows = get_templates_by_urls(urls)
+            for url in urls:
+                if rows.get(url) and rows[url].get('template'):
+                    templates.append((url, rows[url]['template']))
+                else:
+                    print(f"No template found for {url}")
+    return templates
+
+def _output_name(template_name, profile_name):
+    safe = re.sub(r'[^\w.-]+', '_', f"{template_name}__{profile_name}").strip('_')
+    return safe + '.html'
+
+async def personalize_batch_async(templates, profiles, output_dir, limit=4, combined=False, structured=False):
+    """
+    Personalize every template for every profile from one shared news snapshot.
+    
+    Args:
+        templates (list): (template_name, page_html) tuples
+        profiles (list): (profile_name, personality_traits) tuples
+        output_dir (str): Directory the personalized pages are written to
+        limit (int): Maximum number of pages in flight
+        combined (bool): Use the single-call posts+HTML flow
+        structured (bool): Fill the templates locally from structured flow output
+        
+    Returns:
+        list: Report dict per template/profile pair, in input order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    news_snapshot = await asyncio.to_thread(get_news_snapshot)
+    jobs = [(template_name, page_html, profile_name, traits)
+            for template_name, page_html in templates
+            for profile_name, traits in profiles]
+
+    async def personalize(template_name, page_html, profile_name, traits):
+        start = time.perf_counter()
+        entry = {"template": template_name, "profile": profile_name, "output": None, "error": None}
+        try:
+            page = await generate_personalized_html_async(page_html, traits, news_snapshot,
+                                                          combined=combined, structured=structured)
+            if page is None:
+                entry["error"] = "No template section found"
+            else:
+                output_path = os.path.join(output_dir, _output_name(template_name, profile_name))
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(page)
+                entry["output"] = output_path
+        except Exception as e:
+            entry["error"] = str(e)
+        entry["seconds"] = round(time.perf_counter() - start, 3)
+        return entry
+
+    return await fan_out([lambda job=job: personalize(*job) for job in jobs], limit=limit)
+
+def summarize_batch(report, elapsed):
+    """
+    Summarize a batch report.
     
+    Args:
+        report (list): Entries returned by personalize_batch_async
+        elapsed (float): Wall-clock seconds for the whole run
+        
+    Returns:
+        dict: Counts, throughput and latency percentiles
+    """
+    latencies = sorted(entry["seconds"] for entry in report if entry["output"])
+    summary = {
+        "items": len(report),
+        "succeeded": len(latencies),
+        "failed": len(report) - len(latencies),
+        "elapsed_seconds": round(elapsed, 3),
+        "pages_per_minute": round(len(latencies) / elapsed * 60, 2) if elapsed else 0.0,
+    }
+    if latencies:
+        summary["p50_seconds"] = round(statistics.median(latencies), 3)
+        summary["p95_seconds"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate personalized pages from HTML templates")
+    parser.add_argument("html_file", nargs="?", default="example-fixed.html", help="HTML file to personalize")
+    parser.add_argument("--dir", help="Batch mode: directory of .html templates")
+    parser.add_argument("--manifest", help="Batch mode: AstraDB export as a JSONL manifest of url/template entries")
+    parser.add_argument("--urls", help="Batch mode: file with one URL per line to fetch templates from AstraDB")
+    parser.add_argument("--profiles", help="Batch mode: JSONL of personality trait profiles (defaults to personality_traits.json)")
+    parser.add_argument("--output-dir", default="generated", help="Batch mode: directory for personalized pages and report.jsonl")
+    parser.add_argument("--limit", type=int, default=4, help="Batch mode: maximum pages in flight")
+    parser.add_argument("--combined", action="store_true", help="Generate posts and HTML in one flow run")
+    parser.add_argument("--structured", action="store_true", help="Fill templates locally from structured flow output")
+    args = parser.parse_args()
+    
+    if args.dir or args.manifest or args.urls:
+        templates = load_batch_templates(args.dir, args.manifest, args.urls)
+        if args.profiles:
+            profiles = load_trait_profiles(args.profiles)
+        else:
+            with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'personality_traits.json'), 'r') as f:
+                profiles = [("default", format_personality_traits(json.load(f)))]
+        print(f"Personalizing {len(templates)} templates x {len(profiles)} profiles")
+        
+        start = time.perf_counter()
+        report = asyncio.run(personalize_batch_async(templates, profiles, args.output_dir, args.limit,
+                                                     args.combined, args.structured))
+        summary = summarize_batch(report, time.perf_counter() - start)
+        
+        report_path = os.path.join(args.output_dir, 'report.jsonl')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            for entry in report:
+                f.write(json.dumps(entry) + "\n")
+            f.write(json.dumps({"summary": summary}) + "\n")
+        for entry in report:
+            if entry["error"]:
+                print(f"Failed {entry['template']} / {entry['profile']}: {entry['error']}")
+        print(json.dumps(summary, indent=2))
+        print(f"Report saved to: {report_path}")
+        return
+    
+    file_path = args.html_file
     print(f"Processing HTML file: {file_path}")
     
     # Example personality traits
@@ -152,9 +640,14 @@ if __name__ == "__main__":
     Professionalism: 6/10
     Humor: 5/10"""
     
-    generated_file = generate_personalized_content(file_path, personality_traits)
+    generated_file = generate_personalized_content(file_path, personality_traits,
+                                                   combined=args.combined, structured=args.structured)
     
     if not generated_file:
         print("Note: Make sure your HTML file contains the following markers:")
         print("<!-- Template section start -->")
-        print("<!-- Template section end -->") 
\ No newline at end of file
+        print("<!-- Template section end -->")
+
+# Example usage:
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,49 @@
 #!/usr/bin/env python3
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Comment
 import sys
+import copy
 import re
-from openai import OpenAI
+from assistant_client import run_assistant
 import os
 from dotenv import load_dotenv
 import time
 import json
 import html
+from template_engine import template_marker
+from html_parsers import SERIALIZERS, available_parsers, iterparse_html, parse_html, serialize_html, size_report
 
 load_dotenv()
 
-def extract_body(file_path):
+def read_html(file_path):
+    """
+    Read an HTML file and decode it with the first encoding that works.
+    """
+    with open(file_path, 'rb') as file:
+        raw_content = file.read()
+        
+    # Try different encodings
+    for encoding in ['utf-8', 'cp1252', 'ascii']:
+        try:
+            return raw_content.decode(encoding, errors='ignore')
+        except:
+            continue
+    raise Exception("Could not decode file with any supported encoding")
+
+def parse_document(file_path, parser=None):
+    """
+    Parse an HTML file once so every stage can work on the same tree.
+    
+    The backend defaults to HTML_PARSER or the fastest installed one (see html_parsers).
+    """
+    return parse_html(read_html(file_path), parser)
+
+def extract_body(file_path, parser=None):
     """
     Extract only the body content from HTML file.
     """
     try:
-        # Read file and handle encoding
-        with open(file_path, 'rb') as file:
-            raw_content = file.read()
-            
-        # Try different encodings
-        for encoding in ['utf-8', 'cp1252', 'ascii']:
-            try:
-                content = raw_content.decode(encoding, errors='ignore')
-                break
-            except:
-                continue
-                
         # Parse HTML and get body
-        soup = BeautifulSoup(content, 'html.parser')
+        soup = parse_document(file_path, parser)
         body = soup.find('body')
         
         if body:
@@ -43,177 +57,692 @@ def extract_body(file_path):
         print(f"Error processing file: {str(e)}", file=sys.stderr)
         return None
 
+# Groups must repeat at least this often to count as a repeatable section
+MIN_REPEATS = 3
+# Below this confidence the detector defers to the OpenAI Assistant
+MIN_CONFIDENCE = 0.6
+
+# Classes usable in a plain tag.class CSS selector
+SIMPLE_CLASS = re.compile(r'-?[_a-zA-Z][\w-]*')
+
+def _classes(tag):
+    return tuple(sorted(tag.get('class') or ()))
+
+def _group_candidate(tag, member_classes, member_sizes, count_matches):
+    """
+    Turn a group of identical siblings into a ranked candidate.
+    
+    Args:
+        tag (str): Tag name shared by the group
+        member_classes (list): Class tuples, one per member
+        member_sizes (list): Subtree element counts, one per member
+        count_matches (callable): (tag, class) -> number of elements that selector matches in the page
+        
+    Returns:
+        dict: Candidate, or None if the members share no usable class
+    """
+    classes = [name for name in member_classes[0]
+               if SIMPLE_CLASS.fullmatch(name) and all(name in member for member in member_classes)]
+    if not classes:
+        # The assistant contract is a tag+class selector, so classless groups cannot be used
+        return None
+    count = len(member_classes)
+    # Prefer the class that selects the fewest elements outside this group
+    best_class, matches = min(((name, count_matches(tag, name)) for name in classes), key=lambda item: item[1])
+    precision = count / max(matches, count)
+    size = sum(member_sizes) / count
+    return {
+        "tag": tag,
+        "class": best_class,
+        "count": count,
+        "size": size,
+        "precision": round(precision, 3),
+        "score": count * size * precision,
+    }
+
+def detect_repeatable_sections(body, min_repeats=MIN_REPEATS):
+    """
+    Find groups of structurally identical siblings, the usual shape of feeds and card lists.
+    
+    The body is walked once bottom-up. Each element is fingerprinted by its tag, its classes and
+    the tag/class shape of its children; siblings sharing a fingerprint form a group.
+    
+    Args:
+        body (Tag): Parsed <body> element
+        min_repeats (int): Minimum number of siblings for a group to count
+        
+    Returns:
+        list: Candidate dicts with tag, class, count, size, precision and score, best first
+    """
+    elements = [body] + body.find_all(True)
+    sizes = {}
+    fingerprints = {}
+    selector_counts = {}
+    # Children come after their parents in document order, so walking backwards sees them first
+    for element in reversed(elements):
+        children = element.find_all(True, recursive=False)
+        classes = _classes(element)
+        for name in classes:
+            selector_counts[(element.name, name)] = selector_counts.get((element.name, name), 0) + 1
+        sizes[id(element)] = 1 + sum(sizes[id(child)] for child in children)
+        fingerprints[id(element)] = hash((element.name, classes,
+                                          tuple((child.name, _classes(child)) for child in children)))
+    
+    def count_matches(tag, name):
+        return selector_counts.get((tag, name), 0)
+    
+    candidates = []
+    for parent in elements:
+        groups = {}
+        for child in parent.find_all(True, recursive=False):
+            groups.setdefault(fingerprints[id(child)], []).append(child)
+        for group in groups.values():
+            if len(group) < min_repeats:
+                continue
+            candidate = _group_candidate(group[0].name, [_classes(member) for member in group],
+                                         [sizes[id(member)] for member in group], count_matches)
+            if candidate:
+                candidates.append(candidate)
+    candidates.sort(key=lambda candidate: candidate["score"], reverse=True)
+    return candidates
+
+def detect_repeatable_sections_stream(file_path, min_repeats=MIN_REPEATS):
+    """
+    Streaming version of detect_repeatable_sections for very large documents.
+    
+    The file is fed to lxml in chunks and every element is fingerprinted when it closes and then
+    freed, so memory holds only the open elements and small per-sibling records.
+    
+    Args:
+        file_path (str): HTML file to scan
+        min_repeats (int): Minimum number of siblings for a group to count
+        
+    Returns:
+        list: Candidate dicts with tag, class, count, size, precision and score, best first
+    """
+    selector_counts = {}
+    groups_found = []
+    # Records of the already closed children of each open element
+    stack = [[]]
+    for event, element in iterparse_html(file_path):
+        if not isinstance(element.tag, str):
+            continue
+        if event == 'start':
+            stack.append([])
+            continue
+        children = stack.pop()
+        classes = tuple(sorted(element.get('class', '').split()))
+        for name in classes:
+            selector_counts[(element.tag, name)] = selector_counts.get((element.tag, name), 0) + 1
+        groups = {}
+        for record in children:
+            groups.setdefault(record[2], []).append(record)
+        for group in groups.values():
+            if len(group) >= min_repeats:
+                groups_found.append((group[0][0], [record[1] for record in group], [record[3] for record in group]))
+        stack[-1].append((element.tag, classes,
+                          hash((element.tag, classes, tuple((record[0], record[1]) for record in children))),
+                          1 + sum(record[3] for record in children)))
+        # Free the finished subtree and the siblings before it
+        element.clear()
+        parent = element.getparent()
+        while parent is not None and element.getprevious() is not None:
+            del parent[0]
+    
+    # Precision needs page-wide selector counts, which are only complete after the scan
+    candidates = []
+    for tag, member_classes, member_sizes in groups_found:
+        candidate = _group_candidate(tag, member_classes, member_sizes,
+                                     lambda tag, name: selector_counts.get((tag, name), 0))
+        if candidate:
+            candidates.append(candidate)
+    candidates.sort(key=lambda candidate: candidate["score"], reverse=True)
+    return candidates
+
+def choose_repeatable_section(candidates):
+    """
+    Pick the best candidate and say how sure the pick is.
+    
+    Confidence is the selector's precision times how clearly the best group outscores the runner-up.
+    
+    Args:
+        candidates (list): Ranked candidates from detect_repeatable_sections
+        
+    Returns:
+        tuple: (tag_class_json, confidence), or (None, 0.0) if nothing repeats
+    """
+    if not candidates:
+        return None, 0.0
+    best = candidates[0]
+    runner_up = next((candidate["score"] for candidate in candidates[1:]
+                      if (candidate["tag"], candidate["class"]) != (best["tag"], best["class"])), 0.0)
+    confidence = best["precision"] * best["score"] / (best["score"] + runner_up)
+    return json.dumps({"tag": best["tag"], "class": best["class"]}), round(confidence, 3)
+
+def select_repeatable_section(body, min_repeats=MIN_REPEATS):
+    """
+    Pick the most likely repeatable section of a parsed body and say how sure the pick is.
+    
+    Args:
+        body (Tag): Parsed <body> element
+        min_repeats (int): Minimum number of siblings for a group to count
+        
+    Returns:
+        tuple: (tag_class_json, confidence), or (None, 0.0) if nothing repeats
+    """
+    return choose_repeatable_section(detect_repeatable_sections(body, min_repeats))
+
+# Tags whose content says nothing about the page structure
+STRIP_CONTENT_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object']
+STRIP_TAGS = ['link', 'meta']
+# Attributes kept for the assistant; the rest (styles, data-*, long URLs) only cost tokens
+KEEP_ATTRIBUTES = {'class', 'id', 'role'}
+TOKEN_BUDGET = int(os.getenv("ASSISTANT_TOKEN_BUDGET", "8000"))
+# Rough size of a token in characters of HTML
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    """
+    Approximate token count of a prompt.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _minify_pass(body, max_text, max_siblings, max_depth):
+    """
+    Shrink a copy of the body once with the given limits and return it as a compact string.
+    """
+    body = copy.copy(body)
+    for tag in body.find_all(STRIP_CONTENT_TAGS):
+        # Keep the empty element so the layout is still visible
+        tag.clear(decompose=True)
+        tag.attrs = {k: v for k, v in tag.attrs.items() if k in KEEP_ATTRIBUTES}
+    for tag in body.find_all(STRIP_TAGS):
+        tag.decompose()
+    for comment in body.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    
+    for tag in [body] + body.find_all(True):
+        if tag.decomposed:
+            continue
+        tag.attrs = {k: v for k, v in tag.attrs.items() if k in KEEP_ATTRIBUTES}
+        if max_depth is not None and len(list(tag.parents)) - len(list(body.parents)) >= max_depth:
+            tag.clear(decompose=True)
+            continue
+        # Collapse runs of identical siblings to a few samples and a count
+        children = tag.find_all(True, recursive=False)
+        run = []
+        for child in children + [None]:
+            shape = (child.name, tuple(child.get('class') or ())) if child is not None else None
+            if run and shape == run[0][0]:
+                run.append((shape, child))
+                continue
+            if len(run) > max_siblings:
+                first_shape = run[0][0]
+                label = first_shape[0] + ''.join('.' + name for name in first_shape[1])
+                run[max_siblings][1].insert_before(Comment(f" {len(run) - max_siblings} more {label} "))
+                for _, extra in run[max_siblings:]:
+                    extra.decompose()
+            run = [(shape, child)] if child is not None else []
+    
+    for text in body.find_all(string=True):
+        if isinstance(text, Comment):
+            continue
+        collapsed = ' '.join(text.split())
+        if max_text is not None and len(collapsed) > max_text:
+            collapsed = collapsed[:max_text] + '…'
+        if collapsed != text:
+            text.replace_with(collapsed)
+    return str(body)
+
+def minify_body(body, token_budget=TOKEN_BUDGET, max_text=80, max_siblings=3):
+    """
+    Shrink the body sent to the assistant while keeping the tag/class structure it needs.
+    
+    Scripts, styles and SVG contents are emptied, attributes other than class/id/role dropped,
+    text nodes truncated and long runs of identical siblings cut to a few samples plus a count.
+    If the result is still over the token budget, the limits are tightened and the pass repeated.
+    
+    Args:
+        body (Tag): Parsed <body> element; it is not modified
+        token_budget (int): Approximate maximum prompt size in tokens
+        max_text (int): Characters kept per text node on the first pass
+        max_siblings (int): Identical siblings kept per run on the first pass
+        
+    Returns:
+        tuple: (minified_html, stats) where stats reports bytes saved and estimated tokens
+    """
+    original_bytes = len(str(body).encode('utf-8'))
+    max_depth = None
+    passes = 0
+    while True:
+        passes += 1
+        minified = _minify_pass(body, max_text, max_siblings, max_depth)
+        if estimate_tokens(minified) <= token_budget:
+            break
+        # Tighten the limits in order of how little structure they cost
+        if max_text:
+            max_text = max_text // 4 if max_text > 8 else 0
+        elif max_siblings > 2:
+            max_siblings = 2
+        elif max_depth is None:
+            max_depth = 24
+        elif max_depth > 6:
+            max_depth -= 4
+        else:
+            # Budget cannot be met without losing the structure; send the smallest version
+            break
+    minified_bytes = len(minified.encode('utf-8'))
+    stats = {
+        "original_bytes": original_bytes,
+        "minified_bytes": minified_bytes,
+        "saved_bytes": original_bytes - minified_bytes,
+        "saved_pct": round(100 * (1 - minified_bytes / original_bytes), 1) if original_bytes else 0.0,
+        "estimated_tokens": estimate_tokens(minified),
+        "within_budget": estimate_tokens(minified) <= token_budget,
+        "passes": passes,
+    }
+    return minified, stats
+
+def find_repeatable_selector(body, min_confidence=MIN_CONFIDENCE, use_assistant=True, token_budget=TOKEN_BUDGET,
+                             detect=True):
+    """
+    Get the tag+class selector of the repeatable section, using the local detector when it is
+    confident and the OpenAI Assistant otherwise.
+    
+    Args:
+        body (Tag): Parsed <body> element
+        min_confidence (float): Detector confidence required to skip the assistant
+        use_assistant (bool): Fall back to the assistant when the detector is unsure
+        token_budget (int): Approximate maximum size of the minified body sent to the assistant
+        detect (bool): Run the local detector; off when a streaming scan already found it unsure
+        
+    Returns:
+        tuple: (tag_class_json or None, method, minify_stats) where method is 'detector' or
+            'assistant' and minify_stats is None unless the assistant was asked
+    """
+    selector, confidence = select_repeatable_section(body) if detect else (None, 0.0)
+    if selector and (confidence >= min_confidence or not use_assistant):
+        return selector, "detector", None
+    if not use_assistant:
+        return None, "detector", None
+    minified, stats = minify_body(body, token_budget)
+    return process_with_assistant(minified), "assistant", stats
+
 def process_with_assistant(body_content):
     """
     Process the HTML body content using OpenAI Assistant.
     """
     try:
-        client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        
-        # Create a thread
-        thread = client.beta.threads.create()
-        
-        # Add the message to the thread
-        message = client.beta.threads.messages.create(
-            thread_id=thread.id,
-            role="user",
-            content=body_content
-        )
-        
-        # Run the assistant
-        run = client.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=os.getenv('OPENAI_ASSISTANT_ID')
-        )
-        
-        # Wait for completion
-        while True:
-            run_status = client.beta.threads.runs.retrieve(
-                thread_id=thread.id,
-                run_id=run.id
-            )
-            if run_status.status == 'completed':
-                break
-            elif run_status.status in ['failed', 'cancelled', 'expired']:
-                raise Exception(f"Assistant run failed with status: {run_status.status}")
-            time.sleep(1)
-        
-        # Get the assistant's response
-        messages = client.beta.threads.messages.list(thread_id=thread.id)
-        response = messages.data[0].content[0].text.value
-        
-        # Extract JSON part from the response
-        json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
-        if json_match:
-            return json_match.group(1)
-        else:
-            raise Exception("No JSON found in assistant response")
-        
+        return run_assistant(body_content)
     except Exception as e:
         print(f"Error processing with OpenAI Assistant: {str(e)}", file=sys.stderr)
         return None
 
-def make_it_variable(body, tag_class_json):
+def section_name(value, fallback):
     """
-    Takes HTML body content and a tag+class selector in JSON format, identifies repeatable sections,
-    and modifies them to be extendable.
+    Turn a name or class into a section name template markers can carry ([\w.-]+).
+    """
+    return re.sub(r'[^\w.-]+', '-', value).strip('-') or fallback
+
+def parse_selectors(tag_class_json):
+    """
+    Parse the tag+class selectors returned by the assistant.
     
     Args:
-        body (str): HTML body content
-        tag_class_json (str): JSON string containing tag and class info
+        tag_class_json (str): JSON object with tag and class info, or a JSON list of them
         
     Returns:
-        str: Modified HTML with repeatable sections made variable
+        list: (css_selector, section_name) tuples, or None if the JSON is invalid
     """
-    from bs4 import BeautifulSoup
-    
-    # Parse JSON
     try:
-        tag_class_dict = json.loads(tag_class_json)
-        tag = tag_class_dict["tag"].strip("<>")  # Remove angle brackets if present
-        class_name = tag_class_dict["class"]
-        selector = f"{tag}.{class_name}"
+        selectors = json.loads(tag_class_json)
+        if isinstance(selectors, dict):
+            selectors = [selectors]
+        sections = []
+        for tag_class_dict in selectors:
+            tag = tag_class_dict["tag"].strip("<>")  # Remove angle brackets if present
+            class_name = tag_class_dict["class"]
+            name = tag_class_dict.get("name")
+            if name is not None:
+                name = section_name(str(name), tag)
+            elif len(selectors) > 1:
+                # Several regions need distinct section names; derive one from the class
+                name = section_name(class_name, tag)
+            sections.append((f"{tag}.{class_name}", name))
+        return sections
     except json.JSONDecodeError as e:
         print(f"Error parsing JSON: {str(e)}", file=sys.stderr)
-        return body
+        return None
     except KeyError as e:
         print(f"Missing required key in JSON: {str(e)}", file=sys.stderr)
+        return None
+
+def _contains(ancestor, element):
+    return any(parent is ancestor for parent in element.parents)
+
+def mark_repeatable_sections(soup, sections):
+    """
+    Keep the first element of each repeated group and wrap it in template section markers, in place.
+    
+    Matches nested inside another match of the same selector stay part of their outer element,
+    and matches inside or around an already marked section are skipped, so markers never nest.
+    
+    Args:
+        soup (BeautifulSoup or Tag): Parsed document or body to modify
+        sections (list): (css_selector, section_name) tuples from parse_selectors
+        
+    Returns:
+        int: Number of template sections marked
+    """
+    marked = 0
+    used_names = set()
+    templates = []
+    for selector, name in sections:
+        # Find all elements matching the tag+class
+        elements = soup.select(selector)
+        matched = {id(element) for element in elements}
+        elements = [
+            element for element in elements
+            if not any(id(parent) in matched for parent in element.parents)
+            and not any(_contains(template, element) or _contains(element, template) for template in templates)
+        ]
+        
+        if not elements:
+            print(f"No elements found matching {selector} outside the sections already marked", file=sys.stderr)
+            continue
+        
+        if name in used_names:
+            name = f"{name}-{marked}"
+        used_names.add(name)
+            
+        # Get the first element as template
+        template = elements[0]
+        templates.append(template)
+        
+        # Remove all but first instance
+        for element in elements[1:]:
+            element.decompose()
+            
+        # Add comment indicating this is a template section
+        template.insert_before(BeautifulSoup(template_marker("start", name), 'html.parser'))
+        template.insert_after(BeautifulSoup(template_marker("end", name), 'html.parser'))
+        marked += 1
+    return marked
+
+def make_it_variable(body, tag_class_json, serializer=None, collapse_spaces=False, collapse_attributes=False):
+    """
+    Takes HTML body content and tag+class selectors in JSON format, identifies repeatable sections,
+    and modifies them to be extendable.
+    
+    Args:
+        body (str): HTML body content
+        tag_class_json (str): JSON object with tag and class info, or a JSON list of them for pages
+            with several repeatable regions; each entry may carry a "name" for its template section
+        serializer (str, optional): 'compact' (default) or 'pretty'; see html_parsers.serialize_html
+        collapse_spaces (bool): Collapse whitespace in text nodes
+        collapse_attributes (bool): Write empty attributes as booleans and squeeze list-like attribute values
+        
+    Returns:
+        str: Modified HTML with repeatable sections made variable
+    """
+    sections = parse_selectors(tag_class_json)
+    if sections is None:
         return body
     
     # Parse HTML
     soup = BeautifulSoup(body, 'html.parser')
     
-    # Find all elements matching the tag+class
-    elements = soup.select(selector)
-    
-    if not elements:
-        print(f"No elements found matching {selector}", file=sys.stderr)
+    if not mark_repeatable_sections(soup, sections):
         return body
-        
-    # Get the first element as template
-    template = elements[0]
     
-    # Remove all but first instance
-    for element in elements[1:]:
-        element.decompose()
+    return serialize_html(soup, serializer, collapse_spaces, collapse_attributes)
+
+def build_document(head, body):
+    """
+    Create a new HTML document from a head and a body.
+    
+    Args:
+        head (Tag or None): Original head; an empty one is created if missing
+        body (Tag or BeautifulSoup): Body content; it is moved into the new document
         
-    # Add comment indicating this is a template section
-    template.insert_before(BeautifulSoup('<!-- Template section start -->', 'html.parser'))
-    template.insert_after(BeautifulSoup('<!-- Template section end -->', 'html.parser'))
+    Returns:
+        BeautifulSoup: The new document
+    """
+    new_soup = BeautifulSoup('<!DOCTYPE html>\n<html></html>', 'html.parser')
+    html_tag = new_soup.find('html')
+    
+    # Get original head or create new one if not exists
+    if not head:
+        head = new_soup.new_tag('head')
     
-    # Return the prettified HTML with proper formatting
-    return soup.prettify()
+    # Add head and new body to the new document
+    html_tag.append(head)
+    html_tag.append(body)
+    return new_soup
 
-def replace_body_content(file_path, new_body, new_file_path="example-fixed.html"):
+def replace_body_content(file_path, new_body, new_file_path="example-fixed.html", serializer=None,
+                         collapse_spaces=False, collapse_attributes=False):
     """
     Create a new HTML document combining original head with new body content.
+    
+    The serializer options are those of make_it_variable.
     """
     try:
-        # Read the original file and handle encoding
-        with open(file_path, 'rb') as file:
-            raw_content = file.read()
-            
-        # Try different encodings
-        content = None
-        for encoding in ['utf-8', 'cp1252', 'ascii']:
-            try:
-                content = raw_content.decode(encoding, errors='ignore')
-                break
-            except:
-                continue
-                
-        if not content:
-            raise Exception("Could not decode file with any supported encoding")
-            
         # Parse the original HTML and new body
-        original_soup = BeautifulSoup(content, 'html.parser')
+        original_soup = parse_document(file_path)
         new_body_soup = BeautifulSoup(new_body, 'html.parser')
         
-        # Create new HTML document
-        new_soup = BeautifulSoup('<!DOCTYPE html>\n<html></html>', 'html.parser')
-        html_tag = new_soup.find('html')
-        
-        # Get original head or create new one if not exists
-        head = original_soup.find('head')
-        if not head:
-            head = new_soup.new_tag('head')
-        
-        # Add head and new body to the new document
-        html_tag.append(head)
-        html_tag.append(new_body_soup)
+        new_soup = build_document(original_soup.find('head'), new_body_soup)
         
         # Write the complete HTML to the original file
         with open(new_file_path, 'w', encoding='utf-8') as file:
-            file.write(new_soup.prettify())
+            file.write(serialize_html(new_soup, serializer, collapse_spaces, collapse_attributes))
         return True
         
     except Exception as e:
         print(f"Error creating new HTML document: {str(e)}", file=sys.stderr)
         return False
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python fix-html.py <input_file>")
-        sys.exit(1)
-        
-    input_file = sys.argv[1]
-    body_content = extract_body(input_file)
-    
-    if body_content:
-        result = process_with_assistant(body_content)
-        if result:
-            print(result)
-            fixed_html = make_it_variable(body_content, result)
-            
-            # Save a backup of the fixed body content
-            with open("example-fixed.html", "w", encoding='utf-8') as file:
+def process_file(input_file, output_file, min_confidence=MIN_CONFIDENCE, use_assistant=True, token_budget=TOKEN_BUDGET,
+                 parser=None, stream=False, serializer=None, collapse_spaces=False, collapse_attributes=False,
+                 compare_pretty=True):
+    """
+    Run the whole pipeline on one file, parsing it only once.
+    
+    The parsed tree is shared by the extract, make-variable and replace stages; the body is
+    only serialized for the assistant and for the final output. In streaming mode the
+    repeatable section is detected by an incremental scan first, so pages without one are
+    never fully parsed; pages with one are still parsed into a full tree for marking and
+    serialization, which the scan does not replace.
+    
+    Args:
+        input_file (str): HTML file to process
+        output_file (str): Path the fixed document is written to
+        min_confidence (float): Detector confidence required to skip the assistant
+        use_assistant (bool): Fall back to the assistant when the detector is unsure
+        token_budget (int): Approximate maximum size of the body sent to the assistant
+        parser (str, optional): Parser backend (see html_parsers)
+        stream (bool): Detect the repeatable section with the streaming lxml scan (detection only)
+        serializer (str, optional): 'compact' (default) or 'pretty'; see html_parsers.serialize_html
+        collapse_spaces (bool): Collapse whitespace in text nodes
+        collapse_attributes (bool): Write empty attributes as booleans and squeeze list-like attribute values
+        compare_pretty (bool): Also render prettify() output to report the size saved against it
+        
+    Returns:
+        dict: File names, status, selector and how it was found, per-stage timings in seconds,
+            minification and output size stats
+    """
+    timings = {}
+    result = {"input": input_file, "output": None, "status": "ok", "timings": timings}
+    
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        timings[stage] = round(time.perf_counter() - start, 4)
+        return value
+    
+    try:
+        streamed = None
+        if stream:
+            selector, confidence = timed("scan", lambda: choose_repeatable_section(detect_repeatable_sections_stream(input_file)))
+            if selector and (confidence >= min_confidence or not use_assistant):
+                streamed = selector
+            elif not use_assistant:
+                result["status"] = "no selector"
+                return result
+        
+        soup = timed("parse", parse_document, input_file, parser)
+        body = soup.find('body')
+        if not body:
+            result["status"] = "no <body> tag"
+            return result
+        if streamed:
+            selectors, method, minify_stats = streamed, "stream", None
+        else:
+            selectors, method, minify_stats = timed("select", find_repeatable_selector, body, min_confidence,
+                                                    use_assistant, token_budget, not stream)
+        result["method"] = method
+        result["minify"] = minify_stats
+        result["selector"] = selectors
+        sections = parse_selectors(selectors) if selectors else None
+        if not sections:
+            result["status"] = "no selector"
+            return result
+        if not timed("variable", mark_repeatable_sections, body, sections):
+            result["status"] = "no matching elements"
+            return result
+        
+        document = timed("replace", build_document, soup.find('head'), body)
+        pretty_html = timed("compare", document.prettify) if compare_pretty else None
+        fixed_html = timed("serialize", serialize_html, document, serializer, collapse_spaces, collapse_attributes)
+        if pretty_html is not None:
+            result["size"] = size_report(fixed_html, pretty_html)
+        
+        def write():
+            with open(output_file, 'w', encoding='utf-8') as file:
                 file.write(fixed_html)
-            
-            # Replace the body in the original file
-            if replace_body_content(input_file, fixed_html, "example-fixed.html"):
-                print(f"Successfully updated {input_file}")
-            else:
-                print(f"Failed to update {input_file}", file=sys.stderr)
+        timed("write", write)
+        result["output"] = output_file
+    except Exception as e:
+        result["status"] = f"error: {str(e)}"
+    return result
+
+def fixed_file_path(input_file, output_dir=None):
+    """
+    Output path for a processed file: <name>-fixed.html next to the input or in output_dir.
+    """
+    base_name = os.path.splitext(os.path.basename(input_file))[0] + '-fixed.html'
+    return os.path.join(output_dir or os.path.dirname(input_file), base_name)
+
+def process_files(input_files, output_dir=None, workers=None, **options):
+    """
+    Process several files in parallel, one process per file at a time.
+    
+    Args:
+        input_files (list): HTML files to process
+        output_dir (str, optional): Directory for the fixed files; defaults to each input's directory
+        workers (int, optional): Number of worker processes; defaults to the CPU count
+        options: Other process_file arguments (min_confidence, use_assistant, token_budget, parser, stream)
+        
+    Returns:
+        list: process_file results, in input order
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    output_files = [fixed_file_path(input_file, output_dir) for input_file in input_files]
+    workers = min(workers or os.cpu_count() or 1, len(input_files))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(partial(process_file, **options), input_files, output_files))
+
+def print_timing_report(results, elapsed):
+    """
+    Print per-file stage timings and the totals per stage.
+    """
+    totals = {}
+    for result in results:
+        stages = " ".join(f"{stage}={seconds:.3f}s" for stage, seconds in result["timings"].items())
+        print(f"{result['input']}: {result['status']} via {result.get('method', '-')} {stages}")
+        if result.get("minify"):
+            minify = result["minify"]
+            print(f"  minified body {minify['original_bytes']} -> {minify['minified_bytes']} bytes "
+                  f"({minify['saved_pct']}% saved, ~{minify['estimated_tokens']} tokens)")
+        if result.get("size"):
+            size = result["size"]
+            print(f"  template {size['output_bytes']} bytes vs {size['pretty_bytes']} prettified "
+                  f"({size['saved_pct']}% saved)")
+        for stage, seconds in result["timings"].items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+    succeeded = sum(1 for result in results if result["output"])
+    print(f"\nProcessed {succeeded}/{len(results)} files in {elapsed:.2f}s")
+    sized = [result["size"] for result in results if result.get("size")]
+    if sized:
+        output_bytes = sum(size["output_bytes"] for size in sized)
+        pretty_bytes = sum(size["pretty_bytes"] for size in sized)
+        print(f"  templates {output_bytes} bytes vs {pretty_bytes} prettified "
+              f"({100 * (1 - output_bytes / pretty_bytes):.1f}% saved)")
+    for stage, seconds in totals.items():
+        print(f"  {stage:<10} total {seconds:8.3f}s  mean {seconds / len(results):.3f}s")
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Mark the repeatable sections of HTML pages as templates")
+    parser.add_argument("input_files", nargs="+", help="HTML files to process")
+    parser.add_argument("--output-dir", help="Directory for the fixed files (multi-file mode)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for multi-file mode")
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE,
+                        help="Detector confidence required to skip the OpenAI Assistant")
+    parser.add_argument("--no-assistant", action="store_true", help="Only use the local section detector")
+    parser.add_argument("--token-budget", type=int, default=TOKEN_BUDGET,
+                        help="Approximate maximum tokens of the body sent to the assistant")
+    parser.add_argument("--parser", choices=available_parsers(), default=None,
+                        help="HTML parser backend (defaults to HTML_PARSER or the fastest installed)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Detect the repeatable section with an incremental lxml scan first; pages without one "
+                             "are skipped unparsed, pages with one are still fully parsed for marking")
+    parser.add_argument("--serializer", choices=SERIALIZERS, default=None,
+                        help="Output format: compact (no added whitespace, the default) or pretty (indented)")
+    parser.add_argument("--collapse-whitespace", action="store_true",
+                        help="Collapse whitespace in text outside pre, textarea, script and style")
+    parser.add_argument("--collapse-attributes", action="store_true",
+                        help="Write empty attributes as booleans and squeeze whitespace in class/style values")
+    parser.add_argument("--no-size-report", action="store_true",
+                        help="Skip rendering prettify() output to report the size saved against it")
+    args = parser.parse_args()
+    use_assistant = not args.no_assistant
+    
+    if len(args.input_files) > 1 or args.output_dir or args.stream:
+        start = time.perf_counter()
+        results = process_files(args.input_files, args.output_dir, args.workers,
+                                min_confidence=args.min_confidence, use_assistant=use_assistant,
+                                token_budget=args.token_budget, parser=args.parser, stream=args.stream,
+                                serializer=args.serializer, collapse_spaces=args.collapse_whitespace,
+                                collapse_attributes=args.collapse_attributes, compare_pretty=not args.no_size_report)
+        print_timing_report(results, time.perf_counter() - start)
+        return
+        
+    input_file = args.input_files[0]
+    result = process_file(input_file, "example-fixed.html", args.min_confidence, use_assistant, args.token_budget,
+                          args.parser, serializer=args.serializer, collapse_spaces=args.collapse_whitespace,
+                          collapse_attributes=args.collapse_attributes, compare_pretty=not args.no_size_report)
+    minify_stats = result.get("minify")
+    if minify_stats:
+        print(f"Sent {minify_stats['minified_bytes']} of {minify_stats['original_bytes']} body bytes "
+              f"({minify_stats['saved_pct']}% saved, ~{minify_stats['estimated_tokens']} tokens)")
+    if result.get("selector"):
+        print(f"Selector from {result['method']}:")
+        print(result["selector"])
+    if result["output"]:
+        print(f"Successfully updated {input_file}")
+        if result.get("size"):
+            size = result["size"]
+            print(f"Template is {size['output_bytes']} bytes vs {size['pretty_bytes']} prettified "
+                  f"({size['saved_pct']}% saved)")
+    elif result["status"] != "no selector":
+        print(f"Failed to update {input_file}: {result['status']}", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
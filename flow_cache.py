@@ -0,0 +1,166 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Default location of the on-disk flow result cache
+FLOW_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'flow_cache', 'results.sqlite3')
+FLOW_CACHE_KIND = os.getenv("LANGFLOW_CACHE", "memory")
+FLOW_CACHE_TTL = float(os.getenv("LANGFLOW_CACHE_TTL", "3600"))
+
+def flow_cache_key(endpoint: str, message: str, tweaks: Optional[dict] = None,
+                   output_type: str = "chat", input_type: str = "chat", base_url: str = "") -> str:
+    """
+    Content address of a flow run
+
+    Tweaks are serialized with sorted keys so equal inputs hash equally
+    regardless of dict ordering.
+
+    :param base_url: Langflow server the run goes to, so servers never share results
+    :return: SHA-256 hex digest of the canonical request
+    """
+    canonical = json.dumps(
+        {
+            "base_url": base_url,
+            "endpoint": endpoint,
+            "message": message,
+            "tweaks": tweaks or {},
+            "output_type": output_type,
+            "input_type": input_type,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class MemoryBackend:
+    def __init__(self, max_entries: int = 128):
+        """
+        In-process LRU store of flow results
+
+        :param max_entries: results kept before the least recently used is evicted
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Callers get their own copy, so editing a response cannot change the cache
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: dict, ttl: Optional[float]):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (value, None if ttl is None else time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class DiskBackend:
+    def __init__(self, path: str = FLOW_CACHE_PATH):
+        """
+        SQLite store of flow results that survives restarts
+
+        :param path: database path
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                expires_at REAL,
+                response_json TEXT NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute('SELECT expires_at, response_json FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            expires_at, response_json = row
+            if expires_at is not None and expires_at <= time.time():
+                self._conn.execute('DELETE FROM results WHERE key = ?', (key,))
+                self._conn.commit()
+                return None
+        return json.loads(response_json)
+
+    def set(self, key: str, value: dict, ttl: Optional[float]):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO results (key, expires_at, response_json) VALUES (?, ?, ?)',
+                (key, None if ttl is None else time.time() + ttl, json.dumps(value))
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM results')
+            self._conn.commit()
+
+class FlowResultCache:
+    def __init__(self, backend=None, ttl: Optional[float] = 3600):
+        """
+        Memoizes flow responses by a canonical hash of their inputs
+
+        :param backend: object with get(key), set(key, value, ttl) and clear(); defaults to MemoryBackend
+        :param ttl: default seconds a result is reused, or None to keep it until evicted
+        """
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: dict, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            # A zero TTL means the result must never be reused
+            return
+        self.backend.set(key, value, ttl)
+
+    def clear(self):
+        self.backend.clear()
+        self.hits = self.misses = 0
+
+def create_flow_cache(kind: str = FLOW_CACHE_KIND, ttl: float = FLOW_CACHE_TTL) -> Optional[FlowResultCache]:
+    """
+    Build the flow result cache selected by LANGFLOW_CACHE
+
+    :param kind: 'memory', 'disk' or 'off'
+    :param ttl: default seconds a result is reused
+    :return: FlowResultCache, or None when caching is off
+    """
+    if kind == "off":
+        return None
+    if kind == "disk":
+        return FlowResultCache(DiskBackend(), ttl=ttl)
+    return FlowResultCache(MemoryBackend(), ttl=ttl)
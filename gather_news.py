@@ -1,11 +1,127 @@
 import requests
 import json
-from typing import Dict, List, Optional
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# Default location of the on-disk response cache
+NEWS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'news_cache')
+DEFAULT_CATEGORIES = ('entertainment', 'general')
+
+def _parse_max_age(cache_control: str) -> Optional[float]:
+    """
+    Extract max-age from a Cache-Control header
+    :return: max-age in seconds, 0 for no-cache/no-store, or None if absent
+    """
+    directives = [d.strip().lower() for d in cache_control.split(',') if d.strip()]
+    if 'no-cache' in directives or 'no-store' in directives:
+        return 0
+    for directive in directives:
+        if directive.startswith('max-age='):
+            try:
+                return float(directive.split('=', 1)[1])
+            except ValueError:
+                return None
+    return None
+
+class ResponseCache:
+    def __init__(self, cache_dir: Optional[str] = NEWS_CACHE_DIR):
+        """
+        Cache of JSON responses with their validators, kept in memory and optionally on disk
+        :param cache_dir: directory for persisted responses, or None for memory only
+        """
+        self.cache_dir = cache_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        :return: dict with 'body', 'etag', 'last_modified', 'max_age' and 'fetched_at', or None
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is None and self.cache_dir:
+            try:
+                with open(self._path(url), 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+            with self._lock:
+                self._entries[url] = entry
+        return entry
+
+    def set(self, url: str, entry: Dict, persist: bool = True):
+        with self._lock:
+            self._entries[url] = entry
+        if self.cache_dir and persist:
+            tmp_path = self._path(url) + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(url))
+
+_session = None
+_session_lock = threading.Lock()
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_session(pool_size: int = 8) -> requests.Session:
+    """
+    Shared keep-alive session for all NewsAPI instances
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+def get_response_cache() -> ResponseCache:
+    """
+    Shared response cache, so every NewsAPI instance reuses the same headlines
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
 
 class NewsAPI:
-    def __init__(self):
+    def __init__(self, freshness: Optional[float] = None, max_workers: int = 4, timeout: float = 10,
+                 session: Optional[requests.Session] = None, cache: Optional[ResponseCache] = None):
+        """
+        :param freshness: seconds a cached response is reused without contacting the server;
+                          None follows the server's Cache-Control max-age
+        :param max_workers: maximum number of categories fetched at once
+        :param timeout: per-request timeout in seconds
+        """
         self.base_url = "https://saurav.tech/NewsAPI/top-headlines/category"
-    
+        self.freshness = freshness
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = session or get_session()
+        self.cache = cache or get_response_cache()
+
+    def _is_fresh(self, entry: Dict) -> bool:
+        max_age = self.freshness if self.freshness is not None else entry.get('max_age')
+        return bool(max_age) and time.time() - entry['fetched_at'] < max_age
+
     def fetch_news(self, category: str) -> Optional[Dict]:
         """
         Fetch news from the specified category
@@ -13,14 +129,39 @@ class NewsAPI:
         :return: JSON response with news articles
         """
         url = f"{self.base_url}/{category}/us.json"
+        entry = self.cache.get(url)
+        if entry and self._is_fresh(entry):
+            return entry['body']
+
+        # Revalidate a stale copy instead of downloading it again
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
         try:
-            response = requests.get(url)
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            cache_control = response.headers.get('Cache-Control', '')
+            if response.status_code == 304 and entry:
+                entry = dict(entry, fetched_at=time.time(), max_age=_parse_max_age(cache_control))
+                self.cache.set(url, entry)
+                return entry['body']
             response.raise_for_status()
-            return response.json()
+            body = response.json()
+            self.cache.set(url, {
+                'body': body,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'max_age': _parse_max_age(cache_control),
+                'fetched_at': time.time()
+            }, persist='no-store' not in cache_control.lower())
+            return body
         except requests.RequestException as e:
             print(f"Error fetching {category} news: {e}")
-            return None
-    
+            # A stale copy is better than no headlines at all
+            return entry['body'] if entry else None
+
     def get_articles(self, category: str, limit: int = 5) -> List[Dict]:
         """
         Get articles from a specific category
@@ -33,6 +174,276 @@ class NewsAPI:
             return news_data.get('articles', [])[:limit]
         return []
 
+    def get_articles_by_category(self, categories=DEFAULT_CATEGORIES, limit: int = 5) -> Dict[str, List[Dict]]:
+        """
+        Get articles for several categories, fetching them concurrently
+        :param categories: category names
+        :param limit: number of articles to return per category
+        :return: Dict mapping each category to its list of article dictionaries
+        """
+        categories = list(dict.fromkeys(categories))
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(categories)))) as executor:
+            results = executor.map(lambda category: self.get_articles(category, limit), categories)
+            return dict(zip(categories, results))
+
+def article_key(article: Dict) -> str:
+    """
+    Stable identity of an article, shared across categories
+    :return: SHA-256 of the article URL, or of its title when it has no URL
+    """
+    identity = article.get('url') or (article.get('title') or '').strip().lower()
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+class ArticleStore:
+    def __init__(self, path: str = os.path.join(NEWS_CACHE_DIR, 'articles.sqlite3')):
+        """
+        Deduplicated record of every article seen, with the store version it first appeared in
+        :param path: SQLite database path, or ':memory:'
+        """
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS articles (
+                key TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                first_seen REAL NOT NULL,
+                categories TEXT NOT NULL,
+                article_json TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS articles_version ON articles (version);"""
+        )
+        self._conn.commit()
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(MAX(version), 0) FROM articles').fetchone()[0]
+
+    def add(self, articles_by_category: Mapping[str, List[Dict]]) -> int:
+        """
+        Record articles, ignoring ones already stored
+        :param articles_by_category: Dict mapping category to list of article dictionaries
+        :return: store version after the insert; unchanged if nothing was new
+        """
+        now = time.time()
+        with self._lock:
+            version = self._conn.execute('SELECT COALESCE(MAX(version), 0) FROM articles').fetchone()[0]
+            new_version = version + 1
+            added = False
+            for category, articles in articles_by_category.items():
+                for article in articles:
+                    key = article_key(article)
+                    row = self._conn.execute('SELECT categories FROM articles WHERE key = ?', (key,)).fetchone()
+                    if row is None:
+                        self._conn.execute(
+                            'INSERT INTO articles (key, version, first_seen, categories, article_json) VALUES (?, ?, ?, ?, ?)',
+                            (key, new_version, now, json.dumps([category]), json.dumps(article))
+                        )
+                        added = True
+                    else:
+                        categories = json.loads(row[0])
+                        if category not in categories:
+                            categories.append(category)
+                            self._conn.execute('UPDATE articles SET categories = ? WHERE key = ?', (json.dumps(categories), key))
+            self._conn.commit()
+            return new_version if added else version
+
+    def since(self, version: int, categories=None, limit: Optional[int] = None, newest: bool = False) -> List[Dict]:
+        """
+        Articles first seen after the given store version, oldest first
+        :param version: store version the caller has already consumed
+        :param categories: only return articles in one of these categories
+        :param limit: maximum number of articles to return
+        :param newest: when limited, keep the most recent articles instead of the oldest
+        :return: List of article dictionaries
+        """
+        order = 'DESC' if newest else 'ASC'
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT categories, article_json FROM articles WHERE version > ? '
+                f'ORDER BY version {order}, first_seen {order}',
+                (version,)
+            ).fetchall()
+        articles = []
+        for categories_json, article_json in rows:
+            if categories is not None and not set(json.loads(categories_json)) & set(categories):
+                continue
+            articles.append(json.loads(article_json))
+            if limit is not None and len(articles) >= limit:
+                break
+        return articles[::-1] if newest else articles
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+@dataclass(frozen=True)
+class NewsSnapshot:
+    """
+    Immutable set of headlines per category, replaced wholesale on every refresh
+    """
+    version: int = 0
+    fetched_at: float = 0.0
+    articles: Mapping[str, Tuple[Dict, ...]] = field(default_factory=lambda: MappingProxyType({}))
+    # ArticleStore version after this snapshot's articles were recorded
+    store_version: int = 0
+
+    def all_articles(self, categories=None) -> List[Dict]:
+        """
+        :param categories: categories to include, in order; defaults to all of them
+        :return: articles of the requested categories, concatenated
+        """
+        categories = self.articles.keys() if categories is None else categories
+        return [article for category in categories for article in self.articles.get(category, ())]
+
+def make_snapshot(articles_by_category: Dict[str, List[Dict]], version: int, store_version: int = 0) -> NewsSnapshot:
+    return NewsSnapshot(
+        version=version,
+        fetched_at=time.time(),
+        articles=MappingProxyType({category: tuple(articles) for category, articles in articles_by_category.items()}),
+        store_version=store_version
+    )
+
+class NewsRefresher:
+    def __init__(self, categories=DEFAULT_CATEGORIES, limit: int = 5, interval: float = 300,
+                 news_api: Optional[NewsAPI] = None, store: Optional[ArticleStore] = None):
+        """
+        Keeps a NewsSnapshot up to date from a background thread
+        :param categories: categories to keep fresh
+        :param limit: number of articles per category
+        :param interval: seconds between refreshes
+        :param store: ArticleStore every refresh is recorded in, if any
+        """
+        self.store = store
+        self.categories = tuple(categories)
+        self.limit = limit
+        self.interval = interval
+        self.news_api = news_api or NewsAPI()
+        # Readers only ever load this reference, so they never take a lock
+        self._snapshot = NewsSnapshot()
+        self._refresh_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def snapshot(self) -> NewsSnapshot:
+        return self._snapshot
+
+    def refresh(self) -> NewsSnapshot:
+        """
+        Fetch the categories now and publish a new snapshot
+        :return: the published snapshot
+        """
+        with self._refresh_lock:
+            articles_by_category = self.news_api.get_articles_by_category(self.categories, self.limit)
+            # Keep the previous headlines for a category whose fetch came back empty
+            previous = self._snapshot.articles
+            for category, articles in articles_by_category.items():
+                if not articles and previous.get(category):
+                    articles_by_category[category] = list(previous[category])
+            store_version = self.store.add(articles_by_category) if self.store else 0
+            self._snapshot = make_snapshot(articles_by_category, self._snapshot.version + 1, store_version)
+            self._ready.set()
+            return self._snapshot
+
+    def wait_for_snapshot(self, timeout: Optional[float] = None) -> NewsSnapshot:
+        """
+        Block until the first snapshot is available
+        :param timeout: seconds to wait, or None to wait indefinitely
+        :return: the current snapshot (possibly empty if the timeout expired)
+        """
+        self._ready.wait(timeout)
+        return self._snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing news: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='news-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+# Each singleton has its own lock: building one may build the others
+_refresher = None
+_refresher_lock = threading.Lock()
+_article_store = None
+_article_store_lock = threading.Lock()
+
+def get_article_store() -> ArticleStore:
+    """
+    Shared article store under the news cache directory
+    """
+    global _article_store
+    if _article_store is None:
+        with _article_store_lock:
+            if _article_store is None:
+                _article_store = ArticleStore()
+    return _article_store
+
+def get_news_refresher(**kwargs) -> NewsRefresher:
+    """
+    Shared refresher used by page personalization and podcast generation
+    :param kwargs: NewsRefresher arguments, used only when the refresher is first created
+    """
+    global _refresher
+    if _refresher is None:
+        kwargs.setdefault('store', get_article_store())
+        # Built outside the lock, since NewsAPI takes the session and cache locks; a racing
+        # thread's spare refresher is dropped before its thread is ever started
+        refresher = NewsRefresher(**kwargs)
+        with _refresher_lock:
+            if _refresher is None:
+                _refresher = refresher
+    return _refresher
+
+def get_news_snapshot(timeout: Optional[float] = 30) -> NewsSnapshot:
+    """
+    Current headlines, without fetching when the background refresher is running
+    :param timeout: seconds to wait for the first background refresh
+    :return: NewsSnapshot
+    """
+    refresher = get_news_refresher()
+    if refresher.running:
+        return refresher.wait_for_snapshot(timeout)
+    # No background thread: refresh inline when the snapshot is missing or out of date
+    snapshot = refresher.snapshot
+    if snapshot.version == 0 or time.time() - snapshot.fetched_at > refresher.interval:
+        snapshot = refresher.refresh()
+    return snapshot
+
+def format_news_data(articles: List[Dict]) -> str:
+    """
+    Format articles as the plain text block fed to the Langflow prompts
+    :param articles: List of article dictionaries
+    :return: formatted news data
+    """
+    news_data = ""
+    for article in articles:
+        news_data += f"\n{article['title']}\n"
+        news_data += f"Source: {article['source']['name']}\n"
+        news_data += f"Description: {article['description']}\n"
+    return news_data
+
 def display_news(articles: List[Dict], category: str):
     """
     Display formatted news articles
@@ -48,14 +459,11 @@ def display_news(articles: List[Dict], category: str):
 
 def main():
     news_api = NewsAPI()
-    
-    # Fetch entertainment news
-    entertainment_articles = news_api.get_articles('entertainment')
-    display_news(entertainment_articles, 'entertainment')
-    
-    # Fetch general news
-    general_articles = news_api.get_articles('general')
-    display_news(general_articles, 'general')
+
+    # Fetch entertainment and general news concurrently
+    articles_by_category = news_api.get_articles_by_category(['entertainment', 'general'])
+    for category, articles in articles_by_category.items():
+        display_news(articles, category)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
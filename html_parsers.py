@@ -0,0 +1,205 @@
+import os
+import re
+import warnings
+
+from bs4 import BeautifulSoup
+from bs4.dammit import EntitySubstitution
+from bs4.element import PreformattedString
+from bs4.formatter import HTMLFormatter
+
+try:
+    import lxml.etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+try:
+    import html5_parser
+except ImportError:
+    html5_parser = None
+
+try:
+    import html5lib
+except ImportError:
+    html5lib = None
+
+# Backends in order of preference when none is requested; html5lib is spec-exact but slow,
+# so it is only used when asked for by name
+PREFERENCE = ("lxml", "html5-parser", "html.parser")
+DEFAULT_PARSER = os.getenv("HTML_PARSER")
+# Bytes fed to the incremental parser at a time
+CHUNK_SIZE = 256 * 1024
+
+def available_parsers() -> list:
+    """
+    Names of the parser backends that can be used here
+
+    Returns:
+        list: Backend names; 'html.parser' is always available
+    """
+    names = []
+    if lxml_etree is not None:
+        names.append("lxml")
+    if html5_parser is not None:
+        names.append("html5-parser")
+    if html5lib is not None:
+        names.append("html5lib")
+    names.append("html.parser")
+    return names
+
+def get_parser(name: str = None) -> str:
+    """
+    Resolve the backend to use
+
+    Args:
+        name (str, optional): Requested backend; defaults to HTML_PARSER, then the fastest installed one
+
+    Returns:
+        str: Backend name
+    """
+    name = name or DEFAULT_PARSER
+    available = available_parsers()
+    if name:
+        if name in available:
+            return name
+        warnings.warn(f"HTML parser '{name}' is not installed; falling back to the fastest available one.")
+    return next(backend for backend in PREFERENCE if backend in available)
+
+def parse_html(content, parser: str = None) -> BeautifulSoup:
+    """
+    Parse HTML into a BeautifulSoup tree with the chosen backend
+
+    Args:
+        content (str or bytes): HTML to parse
+        parser (str, optional): Backend name; see get_parser
+
+    Returns:
+        BeautifulSoup: Parsed document
+    """
+    parser = get_parser(parser)
+    if parser == "html5-parser":
+        return html5_parser.parse(content, treebuilder="soup", return_root=False)
+    return BeautifulSoup(content, parser)
+
+def iterparse_html(source, events=("start", "end"), chunk_size: int = CHUNK_SIZE):
+    """
+    Parse a large document incrementally, without holding the whole file or tree in memory
+
+    Elements are yielded as the parser reaches them. Callers are expected to clear
+    elements they are done with (element.clear()) so memory stays bounded.
+
+    Args:
+        source (str or file): Path or binary file object
+        events (tuple): lxml pull parser events to report
+        chunk_size (int): Bytes read and fed to the parser at a time
+
+    Returns:
+        generator: (event, lxml element) tuples
+
+    Raises:
+        ImportError: If lxml is not installed
+    """
+    if lxml_etree is None:
+        raise ImportError("Streaming mode needs lxml. Please install lxml to use it.")
+    file = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+    try:
+        parser = lxml_etree.HTMLPullParser(events=events)
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from parser.read_events()
+        parser.close()
+        yield from parser.read_events()
+    finally:
+        if file is not source:
+            file.close()
+
+# Serializer output modes; 'pretty' is BeautifulSoup's indented prettify()
+SERIALIZERS = ("compact", "pretty")
+DEFAULT_SERIALIZER = os.getenv("HTML_SERIALIZER", "compact")
+# Whitespace inside these tags is significant and never collapsed
+PRESERVE_WHITESPACE_TAGS = {"pre", "textarea", "script", "style"}
+# Whitespace-only text directly inside these tags is never rendered
+NO_TEXT_TAGS = {"html", "head", "table", "thead", "tbody", "tfoot", "tr", "colgroup", "select"}
+# Attributes whose values are whitespace-separated lists or declarations
+COLLAPSIBLE_ATTRIBUTES = {"class", "rel", "style", "srcset", "sizes"}
+WHITESPACE = re.compile(r'\s+')
+
+class CompactFormatter(HTMLFormatter):
+    """
+    Formatter that writes empty attributes as booleans and squeezes whitespace in list-like attributes
+    """
+    def __init__(self):
+        super().__init__(entity_substitution=EntitySubstitution.substitute_xml, empty_attributes_are_booleans=True)
+
+    def attributes(self, tag):
+        for key, value in super().attributes(tag):
+            if key in COLLAPSIBLE_ATTRIBUTES and isinstance(value, str):
+                value = WHITESPACE.sub(' ', value).strip()
+                if not value:
+                    continue
+            elif key in COLLAPSIBLE_ATTRIBUTES and isinstance(value, list) and not any(value):
+                continue
+            yield key, value
+
+def collapse_whitespace(soup):
+    """
+    Collapse runs of whitespace in text to one space, in place
+
+    Text inside pre, textarea, script and style is left alone, and whitespace-only text where
+    browsers ignore it (between table rows, in the head, ...) is removed.
+
+    Args:
+        soup (BeautifulSoup or Tag): Tree to clean up
+    """
+    for text in soup.find_all(string=True):
+        if isinstance(text, PreformattedString) or text.find_parent(PRESERVE_WHITESPACE_TAGS):
+            continue
+        collapsed = WHITESPACE.sub(' ', text)
+        if collapsed == ' ' and text.parent is not None and text.parent.name in NO_TEXT_TAGS:
+            text.extract()
+        elif collapsed != text:
+            text.replace_with(collapsed)
+
+def serialize_html(soup, mode: str = None, collapse_spaces: bool = False, collapse_attributes: bool = False) -> str:
+    """
+    Serialize a tree without the indentation prettify() adds
+
+    Args:
+        soup (BeautifulSoup or Tag): Tree to serialize
+        mode (str, optional): 'compact' (default, or HTML_SERIALIZER) or 'pretty'
+        collapse_spaces (bool): Collapse whitespace in text first; this modifies the tree
+        collapse_attributes (bool): Write empty attributes as booleans and squeeze whitespace in
+            class, rel, style, srcset and sizes values
+
+    Returns:
+        str: The HTML
+    """
+    mode = mode or DEFAULT_SERIALIZER
+    if mode not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer '{mode}'; expected one of {', '.join(SERIALIZERS)}")
+    if collapse_spaces:
+        collapse_whitespace(soup)
+    if mode == "pretty":
+        return soup.prettify()
+    return soup.decode(formatter=CompactFormatter() if collapse_attributes else "minimal")
+
+def size_report(html: str, pretty_html: str) -> dict:
+    """
+    Compare serialized output with prettify() output for the same tree
+
+    Args:
+        html (str): The serialized output
+        pretty_html (str): prettify() output, taken before any whitespace collapsing
+
+    Returns:
+        dict: output_bytes, pretty_bytes and saved_pct
+    """
+    output_bytes = len(html.encode('utf-8'))
+    pretty_bytes = len(pretty_html.encode('utf-8'))
+    return {
+        "output_bytes": output_bytes,
+        "pretty_bytes": pretty_bytes,
+        "saved_pct": round(100 * (1 - output_bytes / pretty_bytes), 1) if pretty_bytes else 0.0,
+    }
@@ -3,11 +3,11 @@
 import argparse
 import json
 from argparse import RawTextHelpFormatter
-import requests
 from typing import Optional
 import os
 import warnings
 from dotenv import load_dotenv
+from langflow_client import get_langflow_client, BASE_API_URL
 try:
     from langflow.load import upload_file
 except ImportError:
@@ -16,7 +16,6 @@ except ImportError:
 
 # Load environment variables from ASTRA_OPENAI.env file
 load_dotenv('/Users/hongjoonchew/code/hot-pot/ASTRA_OPENAI.env')
-BASE_API_URL = "http://127.0.0.1:7860"
 LANGFLOW_ID = "cec8e303-62e6-420f-aec8-61e7f486a121"
 FLOW_ID = "c3f30651-6c35-46ac-98b3-8ade04a4178d"
 APPLICATION_TOKEN = os.getenv("ASTRA_LANGFLOW_APPLICATION_TOKEN")
@@ -39,33 +38,31 @@ def run_flow(message: str,
   output_type: str = "chat",
   input_type: str = "chat",
   tweaks: Optional[dict] = None,
-  application_token: Optional[str] = None) -> dict:
+  application_token: Optional[str] = None,
+  use_cache: bool = False) -> dict:
     """
     Run a flow with a given message and optional tweaks.
 
     :param message: The message to send to the flow
     :param endpoint: The ID or the endpoint name of the flow
     :param tweaks: Optional tweaks to customize the flow
+    :param use_cache: Reuse the result of an identical earlier run. Off by default because
+                      the podcast flow fetches live news itself, so equal inputs do not mean equal output
     :return: The JSON response from the flow
     """
     if not endpoint:
         endpoint = ENDPOINT
     if not application_token:
         application_token = APPLICATION_TOKEN
-    api_url = f"{BASE_API_URL}/api/v1/run/{endpoint}"
-
-    payload = {
-        "input_value": message,
-        "output_type": output_type,
-        "input_type": input_type,
-    }
-    headers = None
-    if tweaks:
-        payload["tweaks"] = tweaks
-    if application_token:
-        headers = {"Authorization": "Bearer " + application_token, "Content-Type": "application/json"}
-    response = requests.post(api_url, json=payload, headers=headers)
-    return response.json()
+    return get_langflow_client().run_flow(
+        message,
+        endpoint=endpoint,
+        output_type=output_type,
+        input_type=input_type,
+        tweaks=tweaks,
+        application_token=application_token,
+        use_cache=use_cache
+    )
 
 def main():
     parser = argparse.ArgumentParser(description="""Run a flow with a given message and optional tweaks.
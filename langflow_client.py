@@ -0,0 +1,488 @@
+import os
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from flow_cache import create_flow_cache, flow_cache_key
+
+BASE_API_URL = os.getenv("LANGFLOW_BASE_URL", "http://127.0.0.1:7860")
+POOL_SIZE = int(os.getenv("LANGFLOW_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("LANGFLOW_CONNECT_TIMEOUT", "5"))
+# Flows wait on LLM calls, so the read timeout is generous
+READ_TIMEOUT = float(os.getenv("LANGFLOW_READ_TIMEOUT", "300"))
+MAX_RETRIES = int(os.getenv("LANGFLOW_MAX_RETRIES", "3"))
+ENDPOINT_CONCURRENCY = int(os.getenv("LANGFLOW_ENDPOINT_CONCURRENCY", "4"))
+
+RETRY_STATUSES = {500, 502, 503, 504}
+
+def build_headers(api_key: Optional[str] = None, application_token: Optional[str] = None) -> Optional[dict]:
+    """
+    Authentication headers for a flow run
+
+    :param api_key: Langflow API key, sent as x-api-key
+    :param application_token: DataStax Langflow application token, sent as a bearer token
+    :return: headers dict, or None if no credentials were given
+    """
+    if application_token:
+        return {"Authorization": "Bearer " + application_token, "Content-Type": "application/json"}
+    if api_key:
+        return {"x-api-key": api_key}
+    return None
+
+def build_payload(message: str, output_type: str = "chat", input_type: str = "chat", tweaks: Optional[dict] = None) -> dict:
+    payload = {
+        "input_value": message,
+        "output_type": output_type,
+        "input_type": input_type,
+    }
+    if tweaks:
+        payload["tweaks"] = tweaks
+    return payload
+
+def parse_stream_event(line: str):
+    """
+    Decode one line of a streamed flow run
+
+    With stream=true the run API sends one JSON event per line: 'token' events carry
+    a text chunk, 'end' carries the final result and 'error' a failure.
+
+    :param line: raw line from the response body; bytes when the response declares no charset
+    :return: (event, data) tuple, or None for blank or undecodable lines
+    """
+    if isinstance(line, bytes):
+        line = line.decode("utf-8", errors="replace")
+    line = line.strip()
+    if line.startswith("data:"):
+        line = line[len("data:"):].strip()
+    if not line:
+        return None
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+    return event.get("event"), event.get("data") or {}
+
+def stream_result_text(data: dict) -> Optional[str]:
+    """
+    Text of the final message in an 'end' event, used when the flow did not stream tokens
+    """
+    try:
+        return data["result"]["outputs"][0]["outputs"][0]["results"]["message"]["text"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+def stream_cache_value(data: dict, chunks: list) -> Optional[dict]:
+    """
+    Response to memoize for a finished streamed run: the 'end' event's result, or one
+    built around the streamed text when that result carries no message text
+
+    :param data: data of the 'end' event
+    :param chunks: text chunks yielded during the run
+    :return: run_flow-shaped response, or None if the run produced no text
+    """
+    if stream_result_text(data):
+        return data["result"]
+    text = "".join(chunks)
+    if not text:
+        return None
+    message = {"text": text, "data": {"text": text}}
+    return {"outputs": [{"outputs": [{"results": {"message": message}}]}]}
+
+class FlowStreamError(Exception):
+    pass
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """
+    Full-jitter exponential backoff
+
+    :param attempt: zero-based retry number
+    :return: seconds to sleep before the next attempt
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class LangflowClient:
+    def __init__(self, base_url: str = BASE_API_URL, timeout=None, max_retries: int = MAX_RETRIES,
+                 endpoint_concurrency: int = ENDPOINT_CONCURRENCY, pool_size: int = POOL_SIZE, cache=None):
+        """
+        Pooled, retrying client for the Langflow run API
+
+        :param base_url: Langflow server URL
+        :param timeout: (connect, read) timeout in seconds
+        :param max_retries: retries after a connection error or 5xx response
+        :param endpoint_concurrency: maximum in-flight runs per flow endpoint
+        :param pool_size: number of pooled keep-alive connections
+        :param cache: FlowResultCache for memoized runs, or None to disable
+        """
+        self.base_url = base_url
+        self.cache = cache
+        self.timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+        self.max_retries = max_retries
+        self.endpoint_concurrency = endpoint_concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._semaphores = {}
+        self._semaphores_lock = threading.Lock()
+
+    def _endpoint_semaphore(self, endpoint: str) -> threading.BoundedSemaphore:
+        with self._semaphores_lock:
+            if endpoint not in self._semaphores:
+                self._semaphores[endpoint] = threading.BoundedSemaphore(self.endpoint_concurrency)
+            return self._semaphores[endpoint]
+
+    def run_url(self, endpoint: str) -> str:
+        return f"{self.base_url}/api/v1/run/{endpoint}"
+
+    def run_flow(self, message: str,
+      endpoint: str,
+      output_type: str = "chat",
+      input_type: str = "chat",
+      tweaks: Optional[dict] = None,
+      api_key: Optional[str] = None,
+      application_token: Optional[str] = None,
+      timeout=None,
+      use_cache: bool = True,
+      cache_ttl: Optional[float] = None) -> dict:
+        """
+        Run a flow with a given message and optional tweaks.
+
+        :param message: The message to send to the flow
+        :param endpoint: The ID or the endpoint name of the flow
+        :param tweaks: Optional tweaks to customize the flow
+        :param timeout: Optional (connect, read) timeout override
+        :param use_cache: Reuse the result of an identical earlier run
+        :param cache_ttl: Optional seconds to keep this result, overriding the cache default
+        :return: The JSON response from the flow
+        """
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = flow_cache_key(endpoint, message, tweaks, output_type, input_type, self.base_url)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        payload = build_payload(message, output_type, input_type, tweaks)
+        headers = build_headers(api_key, application_token)
+        with self._endpoint_semaphore(endpoint):
+            response = self._post_with_retries(self.run_url(endpoint), payload, headers, timeout or self.timeout)
+        result = response.json()
+        if cache_key and response.status_code == 200:
+            self.cache.set(cache_key, result, cache_ttl)
+        return result
+
+    def _post_with_retries(self, url: str, payload: dict, headers: Optional[dict], timeout, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(url, json=payload, headers=headers, timeout=timeout, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                # A streamed response holds its pooled connection until it is closed
+                response.close()
+            except requests.ConnectionError:
+                # Includes connect timeouts; a read timeout means the flow ran and is not retried
+                if attempt == self.max_retries:
+                    raise
+            time.sleep(backoff_delay(attempt))
+
+    def stream_flow(self, message: str,
+      endpoint: str,
+      output_type: str = "chat",
+      input_type: str = "chat",
+      tweaks: Optional[dict] = None,
+      api_key: Optional[str] = None,
+      application_token: Optional[str] = None,
+      timeout=None,
+      use_cache: bool = True,
+      cache_ttl: Optional[float] = None):
+        """
+        Run a flow and yield its output text chunk by chunk as the server generates it.
+
+        The model component must have streaming enabled (e.g. a {"stream": True} tweak);
+        otherwise the whole text arrives as one chunk. A memoized result is yielded as a
+        single chunk, and a run that reaches its 'end' event is memoized.
+
+        :param message: The message to send to the flow
+        :param endpoint: The ID or the endpoint name of the flow
+        :param tweaks: Optional tweaks to customize the flow
+        :param timeout: Optional (connect, read) timeout override
+        :param use_cache: Reuse the result of an identical earlier run
+        :param cache_ttl: Optional seconds to keep this result, overriding the cache default
+        :return: generator of text chunks
+        """
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = flow_cache_key(endpoint, message, tweaks, output_type, input_type, self.base_url)
+            cached = self.cache.get(cache_key)
+            if cached is not None and stream_result_text({"result": cached}):
+                yield stream_result_text({"result": cached})
+                return
+        payload = build_payload(message, output_type, input_type, tweaks)
+        headers = build_headers(api_key, application_token)
+        with self._endpoint_semaphore(endpoint):
+            response = self._post_with_retries(
+                self.run_url(endpoint), payload, headers, timeout or self.timeout, params={"stream": "true"}, stream=True
+            )
+            with response:
+                response.raise_for_status()
+                chunks = []
+                for line in response.iter_lines(decode_unicode=True):
+                    parsed = parse_stream_event(line or "")
+                    if parsed is None:
+                        continue
+                    event, data = parsed
+                    if event == "token" and data.get("chunk"):
+                        chunks.append(data["chunk"])
+                        yield data["chunk"]
+                    elif event == "error":
+                        raise FlowStreamError(data.get("error") or data)
+                    elif event == "end":
+                        text = stream_result_text(data)
+                        if not chunks and text:
+                            yield text
+                        if cache_key:
+                            result = stream_cache_value(data, chunks)
+                            if result is not None:
+                                self.cache.set(cache_key, result, cache_ttl)
+                        return
+
+    def close(self):
+        self.session.close()
+
+_client = None
+_client_lock = threading.Lock()
+_flow_cache = None
+_flow_cache_created = False
+_flow_cache_lock = threading.Lock()
+
+def get_flow_cache():
+    """
+    Result cache shared by the sync and async clients (None when LANGFLOW_CACHE=off)
+    """
+    global _flow_cache, _flow_cache_created
+    if not _flow_cache_created:
+        with _flow_cache_lock:
+            if not _flow_cache_created:
+                _flow_cache = create_flow_cache()
+                _flow_cache_created = True
+    return _flow_cache
+
+def get_langflow_client() -> LangflowClient:
+    """
+    Shared client used by agents_stuff, langflow_api and everything built on them
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LangflowClient(cache=get_flow_cache())
+    return _client
+
+class AsyncLangflowClient:
+    def __init__(self, base_url: str = BASE_API_URL, timeout=None, max_retries: int = MAX_RETRIES,
+                 endpoint_concurrency: int = ENDPOINT_CONCURRENCY, pool_size: int = POOL_SIZE, cache=None):
+        """
+        asyncio variant of LangflowClient, bound to the event loop it is used on
+
+        :param base_url: Langflow server URL
+        :param timeout: (connect, read) timeout in seconds
+        :param max_retries: retries after a connection error or 5xx response
+        :param endpoint_concurrency: maximum in-flight runs per flow endpoint
+        :param pool_size: number of pooled keep-alive connections
+        :param cache: FlowResultCache for memoized runs, or None to disable
+        """
+        self.base_url = base_url
+        self.cache = cache
+        self.timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+        self.max_retries = max_retries
+        self.endpoint_concurrency = endpoint_concurrency
+        self.client = httpx.AsyncClient(
+            timeout=self._httpx_timeout(self.timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        self._semaphores = {}
+        # Event loop the client was created for, set by get_async_langflow_client
+        self.loop = None
+
+    @staticmethod
+    def _httpx_timeout(timeout) -> httpx.Timeout:
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        return httpx.Timeout(read_timeout, connect=connect_timeout)
+
+    def _endpoint_semaphore(self, endpoint: str) -> asyncio.Semaphore:
+        if endpoint not in self._semaphores:
+            self._semaphores[endpoint] = asyncio.Semaphore(self.endpoint_concurrency)
+        return self._semaphores[endpoint]
+
+    def run_url(self, endpoint: str) -> str:
+        return f"{self.base_url}/api/v1/run/{endpoint}"
+
+    async def run_flow(self, message: str,
+      endpoint: str,
+      output_type: str = "chat",
+      input_type: str = "chat",
+      tweaks: Optional[dict] = None,
+      api_key: Optional[str] = None,
+      application_token: Optional[str] = None,
+      timeout=None,
+      use_cache: bool = True,
+      cache_ttl: Optional[float] = None) -> dict:
+        """
+        Run a flow with a given message and optional tweaks.
+
+        :param message: The message to send to the flow
+        :param endpoint: The ID or the endpoint name of the flow
+        :param tweaks: Optional tweaks to customize the flow
+        :param timeout: Optional (connect, read) timeout override
+        :param use_cache: Reuse the result of an identical earlier run
+        :param cache_ttl: Optional seconds to keep this result, overriding the cache default
+        :return: The JSON response from the flow
+        """
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = flow_cache_key(endpoint, message, tweaks, output_type, input_type, self.base_url)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        payload = build_payload(message, output_type, input_type, tweaks)
+        headers = build_headers(api_key, application_token)
+        request_timeout = self._httpx_timeout(timeout) if timeout else None
+        async with self._endpoint_semaphore(endpoint):
+            response = await self._post_with_retries(self.run_url(endpoint), payload, headers, request_timeout)
+        result = response.json()
+        if cache_key and response.status_code == 200:
+            self.cache.set(cache_key, result, cache_ttl)
+        return result
+
+    async def stream_flow(self, message: str,
+      endpoint: str,
+      output_type: str = "chat",
+      input_type: str = "chat",
+      tweaks: Optional[dict] = None,
+      api_key: Optional[str] = None,
+      application_token: Optional[str] = None,
+      timeout=None,
+      use_cache: bool = True,
+      cache_ttl: Optional[float] = None):
+        """
+        Run a flow and yield its output text chunk by chunk; see LangflowClient.stream_flow.
+
+        :return: async generator of text chunks
+        """
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = flow_cache_key(endpoint, message, tweaks, output_type, input_type, self.base_url)
+            cached = self.cache.get(cache_key)
+            if cached is not None and stream_result_text({"result": cached}):
+                yield stream_result_text({"result": cached})
+                return
+        payload = build_payload(message, output_type, input_type, tweaks)
+        headers = build_headers(api_key, application_token)
+        kwargs = {"timeout": self._httpx_timeout(timeout)} if timeout else {}
+        async with self._endpoint_semaphore(endpoint):
+            response = await self._send_with_retries(
+                self.client.build_request("POST", self.run_url(endpoint), params={"stream": "true"},
+                                          json=payload, headers=headers, **kwargs)
+            )
+            try:
+                response.raise_for_status()
+                chunks = []
+                async for line in response.aiter_lines():
+                    parsed = parse_stream_event(line)
+                    if parsed is None:
+                        continue
+                    event, data = parsed
+                    if event == "token" and data.get("chunk"):
+                        chunks.append(data["chunk"])
+                        yield data["chunk"]
+                    elif event == "error":
+                        raise FlowStreamError(data.get("error") or data)
+                    elif event == "end":
+                        text = stream_result_text(data)
+                        if not chunks and text:
+                            yield text
+                        if cache_key:
+                            result = stream_cache_value(data, chunks)
+                            if result is not None:
+                                self.cache.set(cache_key, result, cache_ttl)
+                        return
+            finally:
+                await response.aclose()
+
+    async def _post_with_retries(self, url: str, payload: dict, headers: Optional[dict], timeout):
+        kwargs = {"timeout": timeout} if timeout else {}
+        return await self._send_with_retries(
+            self.client.build_request("POST", url, json=payload, headers=headers, **kwargs), stream=False
+        )
+
+    async def _send_with_retries(self, request: httpx.Request, stream: bool = True):
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.send(request, stream=stream)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                await response.aclose()
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadError, httpx.RemoteProtocolError):
+                # Same as requests.ConnectionError on the sync client: resets and dropped
+                # connections are retried, a read timeout means the flow ran and is not
+                if attempt == self.max_retries:
+                    raise
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+_async_client = None
+
+def get_async_langflow_client() -> AsyncLangflowClient:
+    """
+    Shared async client for the running event loop
+    """
+    global _async_client
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.loop is not loop:
+        _async_client = AsyncLangflowClient(cache=get_flow_cache())
+        _async_client.loop = loop
+    return _async_client
+
+async def run_flow_async(message: str, endpoint: str, **kwargs) -> dict:
+    """
+    Run a flow on the shared async client
+
+    :param message: The message to send to the flow
+    :param endpoint: The ID or the endpoint name of the flow
+    :param kwargs: Other AsyncLangflowClient.run_flow arguments
+    :return: The JSON response from the flow
+    """
+    return await get_async_langflow_client().run_flow(message, endpoint=endpoint, **kwargs)
+
+def stream_flow_async(message: str, endpoint: str, **kwargs):
+    """
+    Stream a flow's output on the shared async client
+
+    :return: async generator of text chunks
+    """
+    return get_async_langflow_client().stream_flow(message, endpoint=endpoint, **kwargs)
+
+async def fan_out(coroutine_factories, limit: int = ENDPOINT_CONCURRENCY, return_exceptions: bool = False) -> list:
+    """
+    Run independent flow calls concurrently, at most 'limit' at a time
+
+    :param coroutine_factories: zero-argument callables that each return a coroutine
+    :param limit: maximum number of calls in flight
+    :param return_exceptions: return exceptions in place of results instead of raising the first one
+    :return: results in input order
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(factory):
+        async with semaphore:
+            return await factory()
+
+    return await asyncio.gather(*(run(factory) for factory in coroutine_factories), return_exceptions=return_exceptions)
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Default location of the persistent cache, next to the application files
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template_cache')
+
+# Sentinel stored for lookups that returned no template (negative caching)
+MISSING = object()
+
+class TemplateCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 300, negative_ttl: float = 30, key_func=str):
+        """
+        Bounded in-memory LRU cache for template lookups
+
+        Args:
+            max_entries (int): Maximum number of domains kept before evicting the least recently used
+            ttl (float): Seconds a found template stays valid
+            negative_ttl (float): Seconds a "no template" result stays valid
+            key_func (callable): Maps a lookup key to the cache key; by default the exact string
+                AstraDB rows are keyed by, so two stored URLs never share an entry
+        """
+        self.key_func = key_func
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, domain: str, default=None):
+        """
+        Look up a domain
+
+        Args:
+            domain (str): URL or domain to look up
+            default: Value returned on a miss
+
+        Returns:
+            The cached row, MISSING for a cached negative result, or default on a miss
+        """
+        key = self.key_func(domain)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, domain: str, value):
+        """
+        Store a lookup result; None is cached as a negative result
+
+        Args:
+            domain (str): URL or domain the result belongs to
+            value (dict or None): Template row, or None if the domain has no template
+        """
+        key = self.key_func(domain)
+        if value is None or value is MISSING:
+            value, ttl = MISSING, self.negative_ttl
+        else:
+            ttl = self.ttl
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, domain: str):
+        """
+        Drop a single domain from the cache
+        """
+        with self._lock:
+            self._entries.pop(self.key_func(domain), None)
+
+    def clear(self):
+        """
+        Drop every entry and reset the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Return cache counters
+
+        Returns:
+            dict: Entry count, hits, misses, evictions and hit rate
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+class DiskTemplateCache:
+    def __init__(self, cache_dir: str = CACHE_DIR, revalidate_after: float = 3600, inline_limit: int = 64 * 1024):
+        """
+        Persistent template cache backed by SQLite, surviving browser restarts
+
+        Small templates are stored inline in the SQLite index; templates larger than
+        inline_limit bytes are written to their own file and read back through mmap.
+
+        Args:
+            cache_dir (str): Directory holding the index and the large template files
+            revalidate_after (float): Seconds after which an entry should be checked against AstraDB
+            inline_limit (int): Size in bytes above which a template is stored as a separate file
+        """
+        self.cache_dir = cache_dir
+        self.revalidate_after = revalidate_after
+        self.inline_limit = inline_limit
+        os.makedirs(os.path.join(cache_dir, 'blobs'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite3'), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS templates (
+                domain TEXT PRIMARY KEY,
+                created TEXT,
+                checked_at REAL NOT NULL,
+                row_json TEXT NOT NULL,
+                template TEXT,
+                blob_path TEXT
+            )"""
+        )
+        self._conn.commit()
+
+    def _read_blob(self, blob_path: str) -> str:
+        """
+        Read a large template file through a read-only memory map
+        """
+        with open(blob_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # Decode straight from the mapped pages; slicing the map would copy the file first
+                with memoryview(mapped) as view:
+                    return str(view, 'utf-8')
+
+    def get(self, domain: str):
+        """
+        Look up a domain on disk
+
+        Args:
+            domain (str): URL or domain to look up
+
+        Returns:
+            tuple: (row, needs_revalidation), or (None, False) if the domain is not cached
+        """
+        key = str(domain)
+        with self._lock:
+            record = self._conn.execute(
+                'SELECT checked_at, row_json, template, blob_path FROM templates WHERE domain = ?', (key,)
+            ).fetchone()
+        if record is None:
+            return None, False
+        checked_at, row_json, template, blob_path = record
+        row = json.loads(row_json)
+        try:
+            row['template'] = self._read_blob(blob_path) if blob_path else template
+        except (OSError, ValueError):
+            # Blob went missing or is corrupt; treat as not cached
+            self.invalidate(domain)
+            return None, False
+        return row, time.time() - checked_at > self.revalidate_after
+
+    def set(self, domain: str, row: dict):
+        """
+        Persist a template row
+
+        Args:
+            domain (str): URL or domain the row belongs to
+            row (dict): Row returned by AstraDB, including 'template' and 'created'
+        """
+        key = str(domain)
+        row = dict(row)
+        template = row.pop('template', '') or ''
+        encoded = template.encode('utf-8')
+        blob_path = None
+        if len(encoded) > self.inline_limit:
+            blob_path = os.path.join(self.cache_dir, 'blobs', hashlib.sha256(key.encode('utf-8')).hexdigest() + '.html')
+            tmp_path = blob_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(encoded)
+            os.replace(tmp_path, blob_path)
+            template = None
+        with self._lock:
+            previous = self._conn.execute('SELECT blob_path FROM templates WHERE domain = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO templates (domain, created, checked_at, row_json, template, blob_path) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, row.get('created'), time.time(), json.dumps(row), template, blob_path)
+            )
+            self._conn.commit()
+        if previous and previous[0] and previous[0] != blob_path:
+            self._remove_blob(previous[0])
+
+    def touch(self, domain: str):
+        """
+        Mark an entry as freshly revalidated without rewriting it
+        """
+        with self._lock:
+            self._conn.execute('UPDATE templates SET checked_at = ? WHERE domain = ?', (time.time(), str(domain)))
+            self._conn.commit()
+
+    def invalidate(self, domain: str):
+        """
+        Remove a domain from the disk cache
+        """
+        key = str(domain)
+        with self._lock:
+            previous = self._conn.execute('SELECT blob_path FROM templates WHERE domain = ?', (key,)).fetchone()
+            self._conn.execute('DELETE FROM templates WHERE domain = ?', (key,))
+            self._conn.commit()
+        if previous and previous[0]:
+            self._remove_blob(previous[0])
+
+    def _remove_blob(self, blob_path: str):
+        try:
+            os.remove(blob_path)
+        except OSError:
+            pass
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
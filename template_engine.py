@@ -0,0 +1,343 @@
+import html
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+from functools import lru_cache
+
+# Tags, comments and doctypes; everything between two matches is a text node. Quoted
+# attribute values may contain '>', and a '<' not followed by a tag name is text
+_MARKUP = re.compile(r"""<!--.*?-->|<![^>]*>|</?[A-Za-z](?:"[^"]*"|'[^']*'|[^'">])*>""", re.DOTALL)
+# Elements whose content is code rather than visible text
+_RAW_TEXT_TAGS = ("script", "style")
+
+class SectionTemplate:
+    """
+    A template section compiled into static markup and fillable text slots.
+
+    Every visible text node of the section becomes a slot named slot0, slot1, ...
+    Rendering joins the precompiled static parts with the escaped slot values, so no
+    parsing happens per render.
+    """
+    def __init__(self, template):
+        """
+        Args:
+            template (str): HTML of one repeatable item, e.g. a post card
+        """
+        self.template = template
+        self.parts = []
+        self.slots = []
+        self.examples = {}
+        self._compile(template)
+
+    def _compile(self, template):
+        static = []
+        raw_tag = None
+        position = 0
+        for match in _MARKUP.finditer(template):
+            self._add_text(static, template[position:match.start()], raw_tag)
+            tag = match.group(0)
+            static.append(tag)
+            name = tag[1:].split(None, 1)[0].rstrip("/>").lower() if len(tag) > 1 else ""
+            if raw_tag is None and name in _RAW_TEXT_TAGS and not tag.endswith("/>"):
+                raw_tag = name
+            elif raw_tag is not None and name == "/" + raw_tag:
+                raw_tag = None
+            position = match.end()
+        self._add_text(static, template[position:], raw_tag)
+        self.parts.append("".join(static))
+
+    def _add_text(self, static, text, raw_tag):
+        stripped = text.strip()
+        if not stripped or raw_tag is not None:
+            static.append(text)
+            return
+        # Keep the surrounding whitespace so the filled markup lays out like the original
+        leading = text[:len(text) - len(text.lstrip())]
+        trailing = text[len(text.rstrip()):]
+        static.append(leading)
+        self.parts.append("".join(static))
+        static.clear()
+        static.append(trailing)
+        name = f"slot{len(self.slots)}"
+        self.slots.append(name)
+        self.examples[name] = html.unescape(stripped)
+
+    def schema(self):
+        """
+        Describe the slots for the model.
+
+        Returns:
+            str: JSON object mapping each slot name to the example text it replaces
+        """
+        return json.dumps(self.examples, ensure_ascii=False, indent=2)
+
+    def render(self, values):
+        """
+        Fill the section once.
+
+        Args:
+            values (dict): Slot name to text; missing slots keep the template's text
+
+        Returns:
+            str: Filled HTML
+        """
+        out = [self.parts[0]]
+        for name, part in zip(self.slots, self.parts[1:]):
+            value = values.get(name)
+            out.append(html.escape(str(value), quote=False) if value is not None else html.escape(self.examples[name], quote=False))
+            out.append(part)
+        return "".join(out)
+
+    def render_many(self, items, separator="\n"):
+        """
+        Fill the section once per item.
+
+        Args:
+            items (list): Slot value dicts, one per rendered copy
+            separator (str): Text placed between the copies
+
+        Returns:
+            str: Filled HTML for all items
+        """
+        return separator.join(self.render(values) for values in items)
+
+@lru_cache(maxsize=128)
+def compile_section(template):
+    """
+    Compile a template section, reusing the result for identical sections.
+
+    Args:
+        template (str): HTML of one repeatable item
+
+    Returns:
+        SectionTemplate: The compiled section
+    """
+    return SectionTemplate(template)
+
+def parse_fill_data(text):
+    """
+    Parse the model's slot values, tolerating a fenced ```json block or surrounding text.
+
+    Args:
+        text (str): Raw flow output
+
+    Returns:
+        list: Slot value dicts
+
+    Raises:
+        ValueError: If no JSON list of objects can be found
+    """
+    fenced = re.search(r"```(?:json)?\s*(.*?)\s*```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    start = min((i for i in (text.find("["), text.find("{")) if i != -1), default=-1)
+    if start == -1:
+        raise ValueError("No JSON found in flow output")
+    data, _ = json.JSONDecoder().raw_decode(text[start:])
+    if isinstance(data, dict):
+        data = data.get("items", [data])
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        raise ValueError("Flow output is not a list of slot objects")
+    return data
+
+START_MARKER = "<!-- Template section start -->"
+END_MARKER = "<!-- Template section end -->"
+ENCODINGS = ('utf-8', 'latin1', 'cp1252', 'iso-8859-1')
+# Name given to sections whose markers carry no name
+DEFAULT_SECTION = "default"
+# Matches both the plain markers and named ones like <!-- Template section start: feed -->
+_SECTION_MARKER = re.compile(r"<!--\s*Template section (start|end)(?:\s*:\s*([\w.-]+))?\s*-->")
+
+TemplateSection = namedtuple("TemplateSection", ["name", "start", "end"])
+
+def template_marker(kind, name=None):
+    """
+    Build a section marker comment.
+
+    Args:
+        kind (str): 'start' or 'end'
+        name (str, optional): Section name; the plain marker is used when omitted
+
+    Returns:
+        str: The marker comment
+    """
+    if not name or name == DEFAULT_SECTION:
+        return START_MARKER if kind == "start" else END_MARKER
+    return f"<!-- Template section {kind}: {name} -->"
+
+def scan_sections(content):
+    """
+    Locate every template section in one pass over the page.
+
+    Args:
+        content (str): Full page HTML
+
+    Returns:
+        list: TemplateSection(name, start, end) per section in document order, where
+            start and end delimit the content between the markers
+
+    Raises:
+        ValueError: If there are no sections, or markers are unbalanced, nested or reuse a name
+    """
+    sections = []
+    seen = set()
+    open_name = open_start = None
+    for match in _SECTION_MARKER.finditer(content):
+        kind, name = match.group(1), match.group(2) or DEFAULT_SECTION
+        if kind == "start":
+            if open_name is not None:
+                raise ValueError(f"Template section '{name}' starts inside section '{open_name}'")
+            if name in seen:
+                raise ValueError(f"Duplicate template section '{name}'")
+            open_name, open_start = name, match.end()
+        else:
+            if open_name is None:
+                raise ValueError(f"Template section end for '{name}' without a start")
+            if name != open_name:
+                raise ValueError(f"Template section '{open_name}' closed by an end marker for '{name}'")
+            sections.append(TemplateSection(name, open_start, match.start()))
+            seen.add(name)
+            open_name = None
+    if open_name is not None:
+        raise ValueError(f"Template section '{open_name}' has no end marker")
+    if not sections:
+        raise ValueError("Could not find template markers in the page")
+    return sections
+
+class CompiledTemplate:
+    """
+    A page split once around its template sections.
+
+    The file is decoded and scanned for the markers a single time; rendering a new
+    version of the page only joins the cached static parts with the section contents.
+    """
+    def __init__(self, content, path=None, encoding='utf-8'):
+        """
+        Args:
+            content (str): Full page HTML
+            path (str, optional): File the page was read from
+            encoding (str): Encoding the file was decoded with
+
+        Raises:
+            ValueError: If the page has no template section markers
+        """
+        self.path = path
+        self.encoding = encoding
+        self.index = scan_sections(content)
+        self.names = [section.name for section in self.index]
+        self.sections = {section.name: content[section.start:section.end].strip() for section in self.index}
+        # Static page text around the sections, markers included
+        self.parts = []
+        position = 0
+        for section in self.index:
+            self.parts.append(("\n" if position else "") + content[position:section.start] + "\n")
+            position = section.end
+        self.parts.append("\n" + content[position:])
+
+    @property
+    def section(self):
+        """
+        Content of the first template section.
+        """
+        return self.sections[self.names[0]]
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Read and compile a page file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ValueError: If the page cannot be decoded or its template markers are invalid
+        """
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read(), path)
+
+    @classmethod
+    def from_bytes(cls, raw, path=None):
+        """
+        Compile a page held in memory, trying the supported encodings in order.
+
+        Only decoding failures move on to the next encoding; marker errors from the first
+        encoding that decodes (missing, nested, duplicate or unbalanced sections) are raised.
+
+        Raises:
+            ValueError: If the page cannot be decoded or its template markers are invalid
+        """
+        for encoding in ENCODINGS:
+            try:
+                content = raw.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+            return cls(content, path, encoding)
+        raise ValueError(f"Could not decode the page with any of the attempted encodings: {', '.join(ENCODINGS)}")
+
+    def render(self, new_content):
+        """
+        Build the page with template sections replaced.
+
+        Args:
+            new_content (str or dict): HTML for the first section, or a mapping of section
+                name to HTML; sections not in the mapping keep their template content
+
+        Returns:
+            str: Full page HTML
+        """
+        if isinstance(new_content, str):
+            new_content = {self.names[0]: new_content}
+        out = [self.parts[0]]
+        for name, part in zip(self.names, self.parts[1:]):
+            out.append(new_content.get(name, self.sections[name]))
+            out.append(part)
+        return "".join(out)
+
+@lru_cache(maxsize=32)
+def compile_page(page):
+    """
+    Compile a page held in memory, reusing the result for identical pages.
+
+    Args:
+        page (str or bytes): Full page HTML
+
+    Returns:
+        CompiledTemplate: The compiled page
+
+    Raises:
+        ValueError: If the page has no template section markers
+    """
+    if isinstance(page, bytes):
+        return CompiledTemplate.from_bytes(page)
+    return CompiledTemplate(page)
+
+_compiled_templates = {}
+_compiled_lock = threading.Lock()
+
+def load_compiled_template(path):
+    """
+    Get the compiled form of a page, recompiling only when the file changed.
+
+    Entries are keyed by absolute path and validated against the file's mtime and size.
+
+    Args:
+        path (str): Path to the HTML file
+
+    Returns:
+        CompiledTemplate: The compiled page
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file has no template section markers
+    """
+    key = os.path.abspath(path)
+    stat = os.stat(key)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _compiled_lock:
+        entry = _compiled_templates.get(key)
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+    compiled = CompiledTemplate.from_file(key)
+    with _compiled_lock:
+        _compiled_templates[key] = (stamp, compiled)
+    return compiled